@@ -0,0 +1,142 @@
+"""
+Batch degrees-of-separation queries.
+
+Reads one `source,target` pair per line (IMDB person ids or names, comma
+or tab separated) and writes one JSON object per pair, in input order.
+Queries are answered by a process pool whose workers share the graph
+loaded by the parent instead of receiving a copy with every task.
+"""
+
+import argparse
+import csv
+import functools
+import json
+import multiprocessing
+import os
+import sys
+
+import degrees
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="degrees.py batch",
+        description="Answer many degrees-of-separation queries at once."
+    )
+    parser.add_argument("pairs", nargs="?",
+                        help="file of source,target pairs (default: stdin)")
+    parser.add_argument("-d", "--directory", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per CPU)")
+    degrees.add_filter_arguments(parser)
+    args = parser.parse_args(argv)
+
+    degrees.load_data(args.directory)
+    filters = degrees.path_filters(args)
+
+    if args.pairs is None:
+        run(sys.stdin, sys.stdout, args.directory, args.workers, filters)
+    else:
+        with open(args.pairs, encoding="utf-8") as f:
+            run(f, sys.stdout, args.directory, args.workers, filters)
+
+
+def run(lines, output, directory, workers, filters=None):
+    """
+    Answers every pair read from `lines`, writing and flushing JSON lines
+    to `output` as soon as each result (and all results before it) is
+    ready.
+    `filters` are keyword arguments for degrees.shortest_path.
+    """
+    pairs = read_pairs(lines)
+    task = functools.partial(answer, filters=filters)
+    if workers <= 1:
+        for result in map(task, pairs):
+            output.write(result + "\n")
+            output.flush()
+        return
+
+    with start_pool(directory, workers) as pool:
+        for result in pool.imap(task, pairs, chunksize=16):
+            output.write(result + "\n")
+            output.flush()
+
+
+def start_pool(directory, workers):
+    """
+    Returns a pool of worker processes that can see the loaded graph.
+
+    Forked workers inherit the parent's graph copy-on-write. Where fork is
+    unavailable, each worker loads the graph itself, which memory-maps the
+    shared snapshot written by the parent.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork").Pool(workers)
+    return multiprocessing.Pool(
+        workers, initializer=degrees.load_data, initargs=(directory,)
+    )
+
+
+def read_pairs(lines):
+    """
+    Yields (source, target) pairs from comma or tab separated lines,
+    skipping blank lines.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        delimiter = "\t" if "\t" in line else ","
+        row = next(csv.reader([line], delimiter=delimiter))
+        if len(row) != 2:
+            yield (line.strip(), None)
+        else:
+            yield (row[0].strip(), row[1].strip())
+
+
+def answer(pair, filters=None):
+    """
+    Returns the JSON-encoded answer for a (source, target) pair.
+    """
+    source, target = pair
+    result = {"source": source, "target": target}
+    if target is None:
+        result["error"] = "expected a source and a target"
+        return json.dumps(result)
+
+    try:
+        source_id = resolve(source)
+        target_id = resolve(target)
+    except LookupError as e:
+        result["error"] = str(e)
+        return json.dumps(result)
+
+    path = degrees.shortest_path(source_id, target_id, **(filters or {}))
+    result["source_id"] = source_id
+    result["target_id"] = target_id
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie_id": movie_id, "person_id": person_id}
+            for movie_id, person_id in path
+        ]
+    return json.dumps(result)
+
+
+def resolve(person):
+    """
+    Returns the person_id for an IMDB id or an unambiguous name.
+    """
+    if person in degrees.people:
+        return person
+    person_ids = degrees.names.get(person.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    if not person_ids:
+        raise LookupError(f"person not found: {person}")
+    raise LookupError(
+        f"ambiguous name {person}: {', '.join(sorted(person_ids))}"
+    )
@@ -0,0 +1,280 @@
+"""
+Benchmarks for loading and searching the degrees graph.
+
+Generates seeded, IMDB-shaped datasets of several sizes (power-law cast
+sizes and actor popularity), then measures for each one the cold load
+from CSV, the warm load from the snapshot, peak memory, and latency
+percentiles for shortest_path and neighbors_for_person over a fixed
+query set. Each measurement runs in a fresh process. Results are written
+as JSON so runs on different commits can be compared.
+
+Usage: python benchmark.py [--sizes 10000,100000] [--output FILE]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from graph import SNAPSHOT, percentile
+
+# Syllables combined into generated first and last names
+SYLLABLES = (
+    "an", "bel", "cor", "da", "el", "fin", "gar", "ha", "is", "jo", "ka",
+    "lin", "mar", "no", "or", "pe", "quin", "ro", "sa", "tor", "ul", "ve",
+    "win", "ya", "zel",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degrees on generated datasets."
+    )
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma-separated numbers of people per dataset "
+                             "(default: 10000,100000)")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="shortest_path queries per dataset "
+                             "(default: 200)")
+    parser.add_argument("--seed", type=int, default=50,
+                        help="seed for datasets and queries (default: 50)")
+    parser.add_argument("--data-dir",
+                        help="keep generated datasets here and reuse them "
+                             "(default: a temporary directory)")
+    parser.add_argument("--output",
+                        help="write results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="degrees-bench-")
+    try:
+        results = {
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "datasets": [
+                benchmark(data_dir, size, args.queries, args.seed)
+                for size in sizes
+            ],
+        }
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+def benchmark(data_dir, size, queries, seed):
+    """
+    Generates (or reuses) the dataset of `size` people and measures it.
+    """
+    directory = os.path.join(data_dir, f"people-{size}-seed-{seed}")
+    if not os.path.exists(os.path.join(directory, "stars.csv")):
+        print(f"Generating {size} people...", file=sys.stderr)
+        generate(directory, size, seed)
+    print(f"Measuring {size} people...", file=sys.stderr)
+
+    snapshot = os.path.join(directory, SNAPSHOT)
+    if os.path.exists(snapshot):
+        os.remove(snapshot)
+    cold = in_fresh_process(measure_load, directory)
+    warm = in_fresh_process(measure_queries, directory, queries, seed)
+    return {
+        "people": size,
+        "directory": directory,
+        "csv_load_seconds": cold["seconds"],
+        "csv_load_peak_rss_mb": cold["peak_rss_mb"],
+        "snapshot_load_seconds": warm["seconds"],
+        "snapshot_peak_rss_mb": warm["peak_rss_mb"],
+        "shortest_path_ms": warm["shortest_path_ms"],
+        "neighbors_for_person_ms": warm["neighbors_for_person_ms"],
+        "connected_queries": warm["connected_queries"],
+    }
+
+
+def generate(directory, size, seed):
+    """
+    Writes people.csv, movies.csv and stars.csv for `size` people.
+
+    Movies are a third as many as people. Cast sizes follow a Pareto
+    distribution, and cast members are drawn with Zipf-like popularity,
+    so a few people star in very many movies as they do on IMDB.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    movies = max(1, size // 3)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(size):
+            birth = ""
+            if rng.random() < 0.8:
+                birth = str(rng.randint(1900, 2010))
+            writer.writerow([person + 1, random_name(rng), birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movies):
+            title = " ".join(
+                rng.choice(SYLLABLES).capitalize()
+                for _ in range(rng.randint(1, 3))
+            )
+            writer.writerow([movie + 1, title, rng.randint(1900, 2024)])
+
+    popularity = []
+    total = 0
+    for rank in range(size):
+        total += 1 / (rank + 1) ** 0.8
+        popularity.append(total)
+    people = list(range(1, size + 1))
+    rng.shuffle(people)
+
+    casts = []
+    cast_people = set()
+    for movie in range(movies):
+        cast = min(size, int(rng.paretovariate(1.5)) + 1, 200)
+        casts.append(rng.choices(people, cum_weights=popularity, k=cast))
+        cast_people.update(casts[-1])
+
+    # Everyone in people.csv stars in at least one movie, as on IMDB
+    for person in people:
+        if person not in cast_people:
+            casts[rng.randrange(movies)].append(person)
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie, cast in enumerate(casts):
+            for person in cast:
+                writer.writerow([person, movie + 1])
+
+
+def random_name(rng):
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return f"{first.capitalize()} {last.capitalize()}"
+
+
+def in_fresh_process(function, *args):
+    """
+    Runs `function(*args)` in a newly spawned process, so its timings and
+    peak memory are not affected by earlier measurements.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        return executor.submit(function, *args).result()
+
+
+def measure_load(directory):
+    """
+    Times building the graph from CSV files, including its snapshot.
+    """
+    start = time.perf_counter()
+    degrees.load_data(directory)
+    return {
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def measure_queries(directory, queries, seed):
+    """
+    Times loading the snapshot, then runs a seeded query set.
+    """
+    start = time.perf_counter()
+    degrees.load_data(directory)
+    seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    person_ids = degrees.graph.person_ids
+    pairs = [
+        (person_ids[rng.randrange(len(person_ids))],
+         person_ids[rng.randrange(len(person_ids))])
+        for _ in range(queries)
+    ]
+
+    path_times = []
+    connected = 0
+    for source, target in pairs:
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target)
+        path_times.append(time.perf_counter() - start)
+        connected += path is not None
+
+    neighbor_times = []
+    for source, _ in pairs:
+        start = time.perf_counter()
+        degrees.neighbors_for_person(source)
+        neighbor_times.append(time.perf_counter() - start)
+
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "shortest_path_ms": summarize(path_times),
+        "neighbors_for_person_ms": summarize(neighbor_times),
+        "connected_queries": connected,
+    }
+
+
+def summarize(samples):
+    """
+    Returns latency percentiles in milliseconds for a list of seconds.
+    """
+    ordered = sorted(samples)
+    return {
+        "mean": sum(ordered) / len(ordered) * 1000,
+        "p50": percentile(ordered, 50) * 1000,
+        "p90": percentile(ordered, 90) * 1000,
+        "p99": percentile(ordered, 99) * 1000,
+        "max": ordered[-1] * 1000,
+    }
+
+
+def peak_rss_mb():
+    """
+    Returns this process's peak resident set size in megabytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return peak / 2 ** 20
+    return peak / 2 ** 10
+
+
+def current_commit():
+    """
+    Returns the git commit being benchmarked, or None outside a checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    main()
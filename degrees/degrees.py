@@ -1,7 +1,16 @@
-import csv
+import argparse
+import itertools
+import math
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import NOT_CONNECTED, Movies, Names, People, load_graph
+from landmarks import load_landmarks
+
+# Compact co-star graph that the views below and the search run on
+graph = None
+
+# Landmark distance index, if one has been built for the data directory
+landmarks = None
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -15,52 +24,36 @@ movies = {}
 
 def load_data(directory):
     """
-    Load data from CSV files into memory.
-    """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    Load data from CSV files into memory, or from the directory's
+    binary snapshot when it is up to date with the CSV files.
+    """
+    global graph, landmarks, names, people, movies
+    graph = load_graph(directory)
+    landmarks = load_landmarks(directory, graph)
+    names = Names(graph)
+    people = People(graph)
+    movies = Movies(graph)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+    parser = argparse.ArgumentParser(
+        prog="degrees.py",
+        description="Find the degrees of separation between two people.",
+        epilog="Other commands: " + ", ".join(COMMANDS) + " (see "
+               "python degrees.py COMMAND --help)."
+    )
+    parser.add_argument("directory", nargs="?", default="large",
+                        help="data directory (default: large)")
+    add_filter_arguments(parser)
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory)
     print("Data loaded.")
+    filters = path_filters(args)
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +62,15 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    bounds = separation_bounds(source, target)
+    if bounds is not None and bounds[1] < math.inf and not filters:
+        lower, upper = bounds
+        if lower == upper:
+            print(f"Estimated {lower} degrees of separation.")
+        else:
+            print(f"Estimated {lower} to {upper} degrees of separation.")
+
+    path = shortest_path(source, target, **filters)
 
     if path is None:
         print("Not connected.")
@@ -84,47 +85,236 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def add_filter_arguments(parser):
+    """
+    Adds the options restricting which movies and people a path may use.
+    """
+    parser.add_argument("--from-year", type=int, metavar="YEAR",
+                        help="only use movies released in or after YEAR")
+    parser.add_argument("--to-year", type=int, metavar="YEAR",
+                        help="only use movies released in or before YEAR")
+    parser.add_argument("--exclude-movie", action="append", default=[],
+                        metavar="MOVIE_ID", help="never use this movie")
+    parser.add_argument("--exclude-person", action="append", default=[],
+                        metavar="PERSON_ID",
+                        help="never pass through this person")
+
+
+def path_filters(args):
+    """
+    Returns shortest_path keyword arguments for the options added by
+    add_filter_arguments, exiting on unknown ids.
+    """
+    filters = {}
+    if args.from_year is not None or args.to_year is not None:
+        filters["years"] = (args.from_year, args.to_year)
+    for movie_id in args.exclude_movie:
+        if movie_id not in movies:
+            sys.exit(f"Movie not found: {movie_id}")
+    for person_id in args.exclude_person:
+        if person_id not in people:
+            sys.exit(f"Person not found: {person_id}")
+    if args.exclude_movie:
+        filters["exclude_movies"] = args.exclude_movie
+    if args.exclude_person:
+        filters["exclude_people"] = args.exclude_person
+    return filters
+
+
+def batch_main(argv):
+    import batch
+    batch.main(argv)
+
+
+def serve_main(argv):
+    import server
+    server.main(argv)
+
+
+def distances_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="degrees.py distances",
+        description="Report degrees of separation from one person to "
+                    "everyone else."
+    )
+    parser.add_argument("name", help="person's name or IMDB id")
+    parser.add_argument("-d", "--directory", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("-o", "--output",
+                        help="also write person_id,degrees rows to this CSV")
+    args = parser.parse_args(argv)
+
+    load_data(args.directory)
+    source = args.name
+    if source not in people:
+        source = person_id_for_name(source)
+    if source is None:
+        sys.exit("Person not found.")
+
+    distance, histogram = separation(source)
+    print(f"Degrees of separation from {people[source]['name']}:")
+    for degree, count in enumerate(histogram):
+        print(f"  {degree}: {count}")
+    print(f"  Not connected: {graph.person_count - sum(histogram)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("person_id,degrees\n")
+            for person, degree in enumerate(distance):
+                if degree != NOT_CONNECTED:
+                    f.write(f"{graph.person_ids[person]},{degree}\n")
+
+
+def paths_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="degrees.py paths",
+        description="Count the shortest paths between two people and "
+                    "show some of them."
+    )
+    parser.add_argument("source", help="person's name or IMDB id")
+    parser.add_argument("target", help="person's name or IMDB id")
+    parser.add_argument("-d", "--directory", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("-k", "--show", type=int, default=10,
+                        help="number of paths to print (default: 10)")
+    args = parser.parse_args(argv)
+
+    load_data(args.directory)
+    source, target = args.source, args.target
+    if source not in people:
+        source = person_id_for_name(source)
+    if target not in people:
+        target = person_id_for_name(target)
+    if source is None or target is None:
+        sys.exit("Person not found.")
+
+    count = count_shortest_paths(source, target)
+    if count == 0:
+        print("Not connected.")
+        return
+    print(f"{count} shortest path{'' if count == 1 else 's'}.")
+    paths = itertools.islice(all_shortest_paths(source, target), args.show)
+    for n, path in enumerate(paths, 1):
+        chain = [people[source]["name"]]
+        for movie_id, person_id in path:
+            chain.append(f"({movies[movie_id]['title']})")
+            chain.append(people[person_id]["name"])
+        print(f"{n}: {' '.join(chain)}")
+
+
+def search_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="degrees.py search",
+        description="Look people up by exact, partial or misspelled name."
+    )
+    parser.add_argument("query", help="name or part of a name")
+    parser.add_argument("-d", "--directory", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("-n", "--limit", type=int, default=10,
+                        help="maximum number of candidates (default: 10)")
+    args = parser.parse_args(argv)
+
+    load_data(args.directory)
+    candidates = find_people(args.query, args.limit)
+    if not candidates:
+        sys.exit("Person not found.")
+    for candidate in candidates:
+        print(f"{candidate['score']:.2f}  ID: {candidate['person_id']}, "
+              f"Name: {candidate['name']}, Birth: {candidate['birth']}")
+
+
+def separation(source):
+    """
+    Returns the degrees of separation between the source and every
+    person, as an array indexed like graph.person_ids with NOT_CONNECTED
+    for people not connected, and a list counting the people at each
+    degree of separation.
+    """
+    person = graph.person_index(source)
+    if person is None:
+        raise KeyError(source)
+    return graph.separation(person)
+
+
+def shortest_path(source, target, years=None, exclude_movies=(),
+                  exclude_people=()):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    Optionally only movies released within the inclusive (first, last)
+    `years` range are used (either end may be None), and the movie_ids in
+    `exclude_movies` and person_ids in `exclude_people` are avoided.
+
     If no possible path, returns None.
     """
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if source is None or target is None:
+        return None
+    blocked_movies = graph.movie_mask(years, [
+        movie for movie in map(graph.movie_index, exclude_movies)
+        if movie is not None
+    ])
+    excluded_people = [
+        person for person in map(graph.person_index, exclude_people)
+        if person is not None
+    ]
+    path = graph.shortest_path(
+        source, target, landmarks, blocked_movies, excluded_people
+    )
+    if path is None:
+        return None
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
+
+
+def count_shortest_paths(source, target):
+    """
+    Returns the number of distinct shortest lists of (movie_id, person_id)
+    pairs that connect the source to the target, or 0 if not connected.
+    """
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if source is None or target is None:
+        return 0
+    layers = graph.shortest_path_layers(source, target)
+    if layers is None:
+        return 0
+    return graph.count_shortest_paths(layers)
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, generating them one at a time.
+    """
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if source is None or target is None:
+        return
+    layers = graph.shortest_path_layers(source, target)
+    if layers is None:
+        return
+    for path in graph.shortest_paths(layers):
+        yield [
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path
+        ]
+
 
-    def get_paths(node):
-        path = []
-        while node.parent != None:
-            path.append(node.action)
-            node = node.parent
-        path.reverse()
-        return path
-
-    def explore_paths(node, target, explored=[]):
-        frontier = QueueFrontier()
-        frontier.add(node)
-        while not frontier.empty():
-            node = frontier.remove()
-            explored.append(node.state)
-            for movie, actor in neighbors_for_person(node.state):
-                if actor != node.state and actor not in explored:
-                    if actor == target:
-                        return get_paths(
-                            Node(actor, node, (movie, actor))
-                        )
-                    frontier.add(
-                        Node(actor, node, (movie, actor))
-                    )
-
-    paths = []
-    for movie, actor in neighbors_for_person(source):
-        if actor != source:
-            node = Node(source, None, (movie, actor))
-            if path:= explore_paths(node, target):
-                paths.append(path)
-    if len(paths) > 0:
-        return min(paths, key=len)
-    return None
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two person_ids from the landmark index, or None without an index.
+    """
+    if landmarks is None:
+        return None
+    return landmarks.bounds(
+        graph.person_index(source), graph.person_index(target)
+    )
 
 
 def person_id_for_name(name):
@@ -134,6 +324,13 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        candidates = find_people(name, limit=5)
+        if candidates:
+            print(f"No exact match for '{name}'. Did you mean:")
+            for candidate in candidates:
+                print(f"ID: {candidate['person_id']}, "
+                      f"Name: {candidate['name']}, "
+                      f"Birth: {candidate['birth']}")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -153,18 +350,72 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def find_people(query, limit=10):
+    """
+    Returns up to `limit` people whose names match `query`, best first,
+    without prompting. Each is a dictionary of: person_id, name, birth,
+    and a score between 0 and 1. Exact matches (ignoring case) score 1,
+    followed by names starting with `query`, then names with similar
+    spellings.
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    # Collect (score, name order position) pairs for distinct names
+    exact = graph.people_named(query)
+    matches = []
+    seen = set()
+    for position in graph.prefix_matches(query, limit):
+        name = graph.name_key(graph.name_order[position])
+        score = 1.0 if exact and name == query.lower() else 0.9
+        matches.append((score, position))
+        seen.add(position)
+    if len(matches) < limit:
+        for similarity, position in graph.fuzzy_matches(query, limit):
+            if position not in seen:
+                matches.append((round(similarity * 0.9, 3), position))
+    matches.sort(key=lambda match: -match[0])
+
+    candidates = []
+    for score, position in matches:
+        for person in graph.people_at(position):
+            candidates.append({
+                "person_id": graph.person_ids[person],
+                "name": graph.person_names[person],
+                "birth": graph.person_births[person],
+                "score": score,
+            })
+            if len(candidates) == limit:
+                return candidates
+    return candidates
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
+    person = graph.person_index(person_id)
+    if person is None:
+        raise KeyError(person_id)
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie in graph.movies_of(person):
+        movie_id = graph.movie_ids[movie]
+        for neighbor in graph.stars_of(movie):
+            neighbors.add((movie_id, graph.person_ids[neighbor]))
     return neighbors
 
 
+# Subcommands of degrees.py, by name
+COMMANDS = {
+    "batch": batch_main,
+    "distances": distances_main,
+    "paths": paths_main,
+    "search": search_main,
+    "serve": serve_main,
+}
+
+
 if __name__ == "__main__":
     main()
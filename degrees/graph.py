@@ -0,0 +1,980 @@
+"""
+Compact, integer-indexed storage for the co-star graph.
+
+People and movies are numbered densely in IMDB id order. Who starred in
+what is kept in CSR (compressed sparse row) form: for person `p`, the
+movie indices `person_movies[person_offsets[p]:person_offsets[p + 1]]`,
+and for movie `m`, the person indices
+`movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+"""
+
+import csv
+import itertools
+import json
+import math
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Mapping
+
+# CSV files a graph is built from
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Binary snapshot of a built graph, kept next to the CSV files
+SNAPSHOT = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_VERSION = 4
+
+# Distance recorded for people a breadth-first search never reaches
+UNREACHED = 255
+
+# Largest distance a byte records; a saturated byte means at least this
+SATURATED = UNREACHED - 1
+
+# Distance separation reports for people not connected to the source
+NOT_CONNECTED = -1
+
+# Parent recorded for people a search must not pass through
+EXCLUDED = (-1, -1)
+
+
+class StringTable():
+    """
+    Immutable sequence of strings stored as a single UTF-8 blob,
+    where string `i` spans `blob[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        blob = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            blob += string.encode("utf-8")
+            offsets.append(len(blob))
+        return cls(bytes(blob), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class Graph():
+    """
+    People, movies and the stars relation between them.
+    """
+
+    # Integer arrays and string tables making up a graph, by attribute name
+    ARRAYS = (
+        "person_offsets", "person_movies",
+        "movie_offsets", "movie_people",
+        "name_order", "components",
+        "trigram_offsets", "trigram_names",
+        "movie_release", "release_order",
+    )
+    STRINGS = (
+        "person_ids", "person_names", "person_births",
+        "movie_ids", "movie_titles", "movie_years",
+        "trigrams",
+    )
+
+    # Number of recent movie masks kept for reuse
+    MASKS = 32
+
+    def __init__(self, **tables):
+        for name in self.ARRAYS + self.STRINGS:
+            setattr(self, name, tables[name])
+        self.masks = {}
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Builds a graph from the people, movies and stars CSV files.
+        """
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            people = {
+                row["id"]: (row["name"], row["birth"])
+                for row in csv.DictReader(f)
+            }
+        person_ids = sorted(people)
+        person_index = {
+            person_id: i for i, person_id in enumerate(person_ids)
+        }
+
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            movies = {
+                row["id"]: (row["title"], row["year"])
+                for row in csv.DictReader(f)
+            }
+        movie_ids = sorted(movies)
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        # Rows referring to unknown people or movies are skipped
+        stars = set()
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    stars.add((person_index[row["person_id"]],
+                               movie_index[row["movie_id"]]))
+                except KeyError:
+                    pass
+
+        person_offsets, person_movies = adjacency(
+            stars, len(person_ids)
+        )
+        movie_offsets, movie_people = adjacency(
+            ((m, p) for p, m in stars), len(movie_ids)
+        )
+
+        components = component_labels(
+            len(person_ids), movie_offsets, movie_people
+        )
+
+        names = [people[person_id][0] for person_id in person_ids]
+        name_order = array("i", sorted(
+            range(len(names)), key=lambda p: names[p].lower()
+        ))
+        grams, trigram_offsets, trigram_names = trigram_index(
+            names, name_order
+        )
+
+        # Release years as integers (0 if unknown), and movies in year order
+        movie_release = array("i", (
+            int(year) if year.isdigit() else 0
+            for year in (movies[movie_id][1] for movie_id in movie_ids)
+        ))
+        release_order = array("i", sorted(
+            range(len(movie_ids)), key=movie_release.__getitem__
+        ))
+
+        return cls(
+            person_offsets=person_offsets,
+            person_movies=person_movies,
+            movie_offsets=movie_offsets,
+            movie_people=movie_people,
+            name_order=name_order,
+            components=components,
+            trigram_offsets=trigram_offsets,
+            trigram_names=trigram_names,
+            movie_release=movie_release,
+            release_order=release_order,
+            trigrams=StringTable.from_strings(grams),
+            person_ids=StringTable.from_strings(person_ids),
+            person_names=StringTable.from_strings(names),
+            person_births=StringTable.from_strings(
+                people[person_id][1] for person_id in person_ids
+            ),
+            movie_ids=StringTable.from_strings(movie_ids),
+            movie_titles=StringTable.from_strings(
+                movies[movie_id][0] for movie_id in movie_ids
+            ),
+            movie_years=StringTable.from_strings(
+                movies[movie_id][1] for movie_id in movie_ids
+            ),
+        )
+
+    @classmethod
+    def load(cls, path, signature=None):
+        """
+        Memory-maps a snapshot written by `save`. Returns None if the file
+        is missing, was written by another format version, or does not
+        match the expected source `signature`.
+        """
+        mapped = map_file(path, SNAPSHOT_MAGIC)
+        if mapped is None:
+            return None
+        header, view, start = mapped
+
+        # A corrupt header is treated like a missing snapshot
+        try:
+            if (header["version"] != SNAPSHOT_VERSION
+                    or header["byteorder"] != sys.byteorder
+                    or (signature is not None
+                        and header["signature"] != signature)):
+                return None
+
+            sections = {
+                name: view[start + offset:start + offset + size].cast(typecode)
+                for name, (typecode, offset, size)
+                in header["sections"].items()
+            }
+            tables = {name: sections[name] for name in cls.ARRAYS}
+            for name in cls.STRINGS:
+                tables[name] = StringTable(
+                    sections[f"{name}.blob"], sections[f"{name}.offsets"]
+                )
+        except (ValueError, KeyError, TypeError):
+            return None
+        return cls(**tables)
+
+    def save(self, path, signature=None):
+        """
+        Writes the graph to a snapshot file that `load` can memory-map.
+        """
+        sections = {name: getattr(self, name) for name in self.ARRAYS}
+        for name in self.STRINGS:
+            table = getattr(self, name)
+            sections[f"{name}.blob"] = table.blob
+            sections[f"{name}.offsets"] = table.offsets
+
+        # Lay sections out after the header, each aligned to 8 bytes
+        layout = {}
+        position = 0
+        for name, section in sections.items():
+            section = memoryview(section)
+            layout[name] = (section.format, position, section.nbytes)
+            position = align(position + section.nbytes)
+
+        write_file(path, SNAPSHOT_MAGIC, {
+            "version": SNAPSHOT_VERSION,
+            "byteorder": sys.byteorder,
+            "signature": signature,
+            "sections": layout,
+        }, [(layout[name][1], section) for name, section in sections.items()])
+
+    @property
+    def person_count(self):
+        return len(self.person_offsets) - 1
+
+    @property
+    def movie_count(self):
+        return len(self.movie_offsets) - 1
+
+    def person_index(self, person_id):
+        """
+        Returns the index of a person's IMDB id, or None if unknown.
+        """
+        return find(self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the index of a movie's IMDB id, or None if unknown.
+        """
+        return find(self.movie_ids, movie_id)
+
+    def movies_of(self, person):
+        """
+        Returns the indices of the movies a person starred in.
+        """
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the indices of the people who starred in a movie.
+        """
+        offsets = self.movie_offsets
+        return self.movie_people[offsets[movie]:offsets[movie + 1]]
+
+    def name_key(self, person):
+        return self.person_names[person].lower()
+
+    def people_named(self, name):
+        """
+        Returns the indices of all people whose name matches
+        `name`, ignoring case.
+        """
+        name = name.lower()
+        order = self.name_order
+        position = bisect_left(order, name, key=self.name_key)
+        if position < len(order) and self.name_key(order[position]) == name:
+            return self.people_at(position)
+        return []
+
+    def people_at(self, position):
+        """
+        Returns the indices of all people sharing the name at `position`
+        in name order.
+        """
+        order = self.name_order
+        name = self.name_key(order[position])
+        people = []
+        while (position < len(order)
+               and self.name_key(order[position]) == name):
+            people.append(order[position])
+            position += 1
+        return people
+
+    def prefix_matches(self, prefix, limit):
+        """
+        Returns up to `limit` name order positions of distinct names that
+        start with `prefix`, ignoring case, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        order = self.name_order
+        position = bisect_left(order, prefix, key=self.name_key)
+        matches = []
+        previous = None
+        while len(matches) < limit and position < len(order):
+            name = self.name_key(order[position])
+            if not name.startswith(prefix):
+                break
+            if name != previous:
+                matches.append(position)
+                previous = name
+            position += 1
+        return matches
+
+    def fuzzy_matches(self, query, limit, threshold=0.3):
+        """
+        Returns up to `limit` (similarity, position) pairs for the distinct
+        names most similar to `query`, best first. Similarity is the Dice
+        coefficient of the names' trigram sets, between 0 and 1, and names
+        below `threshold` are left out.
+        """
+        grams = trigrams(query.lower())
+        shared = Counter()
+        for gram in grams:
+            i = find(self.trigrams, gram)
+            if i is not None:
+                start = self.trigram_offsets[i]
+                end = self.trigram_offsets[i + 1]
+                shared.update(self.trigram_names[start:end])
+
+        # Rank a generous shortlist by shared trigram count, then score it
+        matches = []
+        for position, count in shared.most_common(limit * 10):
+            name = self.name_key(self.name_order[position])
+            similarity = 2 * count / (len(grams) + len(trigrams(name)))
+            if similarity >= threshold:
+                matches.append((similarity, position))
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return matches[:limit]
+
+    def movie_mask(self, years=None, movies=()):
+        """
+        Returns a bytearray with a nonzero entry for each movie a search
+        may not use, or None if every movie is allowed.
+
+        `years` is an inclusive (first, last) range of release years,
+        either end of which may be None, and excludes movies of unknown
+        year. `movies` are movie indices to exclude. Recent masks are
+        reused, so they must not be modified.
+        """
+        if years is None and not movies:
+            return None
+        key = (years, frozenset(movies))
+        if key not in self.masks:
+            if len(self.masks) >= self.MASKS:
+                self.masks.clear()
+            self.masks[key] = self.build_mask(years, movies)
+        return self.masks[key]
+
+    def build_mask(self, years, movies):
+        mask = bytearray(self.movie_count)
+
+        if years is not None:
+            first, last = years
+            release = self.movie_release.__getitem__
+            order = self.release_order
+            start = bisect_left(order, max(first or 1, 1), key=release)
+            end = len(order)
+            if last is not None:
+                end = bisect_right(order, last, key=release)
+
+            # Mark whichever side of the range is smaller
+            if end - start > len(order) // 2:
+                for movie in itertools.chain(order[:start], order[end:]):
+                    mask[movie] = 1
+            else:
+                mask = bytearray(b"\x01") * self.movie_count
+                for movie in order[start:end]:
+                    mask[movie] = 0
+
+        for movie in movies:
+            mask[movie] = 1
+        return mask
+
+    def shortest_path(self, source, target, landmarks=None,
+                      blocked_movies=None, excluded_people=()):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect the source to the target, or None if not connected.
+
+        People in different connected components are answered without
+        searching. With a landmark index, people who cannot lie on a
+        shortest path are also pruned from the search.
+
+        `blocked_movies` is a mask from `movie_mask` of movies the path may
+        not use, and `excluded_people` are person indices it may not pass
+        through. Landmark pruning is skipped for such filtered searches,
+        since landmark distances are measured over the whole graph.
+        """
+        if source == target:
+            return []
+        if self.components[source] != self.components[target]:
+            return None
+
+        guide = None
+        upper = math.inf
+        filtered = blocked_movies is not None or excluded_people
+        if landmarks is not None and not filtered:
+            lower, upper = landmarks.bounds(source, target)
+            if lower == math.inf:
+                return None
+            if upper < math.inf:
+                guide = landmarks.guide(source, target)
+
+        # Blocked movies start out marked as expanded and excluded people
+        # as reached, so the search skips them at no extra cost
+        if blocked_movies is None:
+            blocked_movies = bytearray(self.movie_count)
+        blocked = {
+            person: EXCLUDED for person in excluded_people
+            if person != source and person != target
+        }
+
+        # Each side maps a reached person to the (movie, person) step that
+        # links it back towards the side's starting person, and marks the
+        # movies it has expanded so no cast is scanned twice
+        forward = {**blocked, source: None}
+        backward = {**blocked, target: None}
+        forward_movies = bytearray(blocked_movies)
+        backward_movies = bytearray(blocked_movies)
+        forward_frontier = [source]
+        backward_frontier = [target]
+        forward_depth = backward_depth = 0
+
+        while forward_frontier and backward_frontier:
+
+            # Expand a whole level of the smaller frontier, so the two
+            # searches meet in the middle of the shortest path
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_depth += 1
+                meeting, forward_frontier = self.expand_level(
+                    forward_frontier, forward, forward_movies, backward,
+                    guide, target, upper - forward_depth
+                )
+            else:
+                backward_depth += 1
+                meeting, backward_frontier = self.expand_level(
+                    backward_frontier, backward, backward_movies, forward,
+                    guide, source, upper - backward_depth
+                )
+            if meeting is not None:
+                return join_paths(meeting, forward, backward)
+
+        return None
+
+    def expand_level(self, frontier, parents, expanded, other_parents,
+                     guide=None, goal=None, slack=math.inf):
+        """
+        Expands every person in `frontier` by one step, recording new
+        people in `parents`. Returns a person also reached by the opposite
+        search (or None) together with the next frontier.
+
+        `guide` is a landmark's distance row: newly reached people whose
+        lower bound on the distance to `goal` exceeds `slack` cannot lie
+        on a shortest path and are skipped.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        if guide is not None:
+            remaining = guide[goal]
+
+        next_frontier = []
+        for person in frontier:
+            start, end = person_offsets[person], person_offsets[person + 1]
+            for movie in person_movies[start:end]:
+                if expanded[movie]:
+                    continue
+                expanded[movie] = 1
+                start, end = movie_offsets[movie], movie_offsets[movie + 1]
+                for neighbor in movie_people[start:end]:
+                    if neighbor in parents:
+                        continue
+                    if (guide is not None
+                            and abs(guide[neighbor] - remaining) > slack):
+                        continue
+                    parents[neighbor] = (movie, person)
+                    if neighbor in other_parents:
+                        return neighbor, next_frontier
+                    next_frontier.append(neighbor)
+        return None, next_frontier
+
+    def shortest_path_layers(self, source, target):
+        """
+        Returns the layers of every shortest path between the source and
+        the target: layer `k` is the set of people `k` steps from the
+        source on some shortest path, so the first layer is {source} and
+        the last is {target}. Returns None if not connected.
+        """
+        if source == target:
+            return [{source}]
+        if self.components[source] != self.components[target]:
+            return None
+
+        # Bidirectional search over whole levels, recording each side's
+        # depths, until the newest level meets the other side
+        forward, forward_movies = {source: 0}, set()
+        backward, backward_movies = {target: 0}, set()
+        forward_frontier = [source]
+        backward_frontier = [target]
+        forward_depth = backward_depth = 0
+        meeting = set()
+        while not meeting:
+            if not forward_frontier or not backward_frontier:
+                return None
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_depth += 1
+                forward_frontier = self.next_level(
+                    forward_frontier, forward, forward_movies, forward_depth
+                )
+                meeting = {p for p in forward_frontier if p in backward}
+            else:
+                backward_depth += 1
+                backward_frontier = self.next_level(
+                    backward_frontier, backward, backward_movies,
+                    backward_depth
+                )
+                meeting = {p for p in backward_frontier if p in forward}
+
+        # Every meeting person is forward_depth steps from the source and
+        # backward_depth steps from the target. Grow the layers outwards
+        # from them through neighbors one step closer to either end
+        length = forward_depth + backward_depth
+        layers = [None] * (length + 1)
+        layers[forward_depth] = meeting
+        for k in range(forward_depth, 0, -1):
+            layers[k - 1] = self.adjacent(layers[k], forward, k - 1)
+        for k in range(forward_depth, length):
+            layers[k + 1] = self.adjacent(layers[k], backward, length - k - 1)
+        return layers
+
+    def next_level(self, frontier, depths, expanded, depth):
+        """
+        Returns the people first reached from `frontier`, recording them
+        in `depths` at `depth`.
+        """
+        next_frontier = []
+        for person in frontier:
+            for movie in self.movies_of(person):
+                if movie in expanded:
+                    continue
+                expanded.add(movie)
+                for neighbor in self.stars_of(movie):
+                    if neighbor not in depths:
+                        depths[neighbor] = depth
+                        next_frontier.append(neighbor)
+        return next_frontier
+
+    def adjacent(self, layer, depths, depth):
+        """
+        Returns the people co-starring with anyone in `layer` whose
+        recorded depth is `depth`.
+        """
+        return {
+            neighbor
+            for person in layer
+            for movie in self.movies_of(person)
+            for neighbor in self.stars_of(movie)
+            if depths.get(neighbor) == depth
+        }
+
+    def count_shortest_paths(self, layers):
+        """
+        Returns the number of distinct shortest (movie, person) paths
+        through `layers`, by dynamic programming over the layers rather
+        than enumerating paths.
+        """
+        counts = {person: 1 for person in layers[0]}
+        for layer in layers[1:]:
+            counts = {
+                person: sum(
+                    counts.get(neighbor, 0)
+                    for movie in self.movies_of(person)
+                    for neighbor in self.stars_of(movie)
+                )
+                for person in layer
+            }
+        return sum(counts.values())
+
+    def shortest_paths(self, layers):
+        """
+        Lazily yields every shortest path through `layers` as a list of
+        (movie, person) index pairs, holding only one path in memory.
+        """
+        path = []
+
+        def extend(person, k):
+            if k == len(layers) - 1:
+                yield list(path)
+                return
+            for movie in self.movies_of(person):
+                for neighbor in self.stars_of(movie):
+                    if neighbor in layers[k + 1]:
+                        path.append((movie, neighbor))
+                        yield from extend(neighbor, k + 1)
+                        path.pop()
+
+        for source in layers[0]:
+            yield from extend(source, 0)
+
+    def distances(self, source):
+        """
+        Returns the number of degrees between the source and every person,
+        as one byte per person index, the form landmark rows are stored in.
+        Unreachable people are UNREACHED, and distances beyond the range of
+        a byte saturate at SATURATED.
+        """
+        distance = bytearray([UNREACHED]) * self.person_count
+        self.breadth_first(source, distance, UNREACHED, SATURATED)
+        return distance
+
+    def separation(self, source):
+        """
+        Returns the number of degrees between the source and every person,
+        as an array indexed by person with NOT_CONNECTED for people not
+        connected, and a histogram whose entry `d` counts the people `d`
+        degrees from the source.
+        """
+        distance = array("i", [NOT_CONNECTED]) * self.person_count
+        histogram = self.breadth_first(source, distance, NOT_CONNECTED)
+        return distance, histogram
+
+    def breadth_first(self, source, distance, unreached, limit=math.inf):
+        """
+        Runs one breadth-first search from the source, a whole level at a
+        time, recording in `distance` (`unreached` for every person to
+        begin with) the degrees of each person reached, capped at `limit`.
+        Returns a histogram whose entry `d` counts the people `d` degrees
+        from the source.
+        """
+        distance[source] = 0
+        histogram = [1]
+        expanded = bytearray(self.movie_count)
+
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+
+        frontier = [source]
+        while frontier:
+            depth = min(len(histogram), limit)
+
+            # Gather the movies this level reaches for the first time, so
+            # each cast is scanned once over the whole search
+            level_movies = []
+            for person in frontier:
+                start, end = person_offsets[person], person_offsets[person + 1]
+                for movie in person_movies[start:end]:
+                    if not expanded[movie]:
+                        expanded[movie] = 1
+                        level_movies.append(movie)
+
+            frontier = []
+            for movie in level_movies:
+                start, end = movie_offsets[movie], movie_offsets[movie + 1]
+                for neighbor in movie_people[start:end]:
+                    if distance[neighbor] == unreached:
+                        distance[neighbor] = depth
+                        frontier.append(neighbor)
+            if frontier:
+                histogram.append(len(frontier))
+        return histogram
+
+
+class People(Mapping):
+    """
+    Read-only view of a graph's people, keyed by person_id, in the
+    shape of a dictionary of: name, birth, movies (a set of movie_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        person = self.graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": self.graph.person_names[person],
+            "birth": self.graph.person_births[person],
+            "movies": {
+                self.graph.movie_ids[movie]
+                for movie in self.graph.movies_of(person)
+            }
+        }
+
+    def __contains__(self, person_id):
+        return self.graph.person_index(person_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.person_count
+
+
+class Movies(Mapping):
+    """
+    Read-only view of a graph's movies, keyed by movie_id, in the
+    shape of a dictionary of: title, year, stars (a set of person_ids).
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        movie = self.graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": self.graph.movie_titles[movie],
+            "year": self.graph.movie_years[movie],
+            "stars": {
+                self.graph.person_ids[person]
+                for person in self.graph.stars_of(movie)
+            }
+        }
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_index(movie_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.movie_count
+
+
+class Names(Mapping):
+    """
+    Read-only view mapping lowercase names to a set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if not people:
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        previous = None
+        for person in self.graph.name_order:
+            name = self.graph.name_key(person)
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def load_graph(directory):
+    """
+    Returns the graph for a data directory, memory-mapped from its
+    snapshot when that is up to date with the CSV files, and otherwise
+    built from the CSV files and snapshotted for the next run.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    signature = source_signature(directory)
+    graph = Graph.load(path, signature)
+    if graph is None:
+        graph = Graph.from_csv(directory)
+        try:
+            graph.save(path, signature)
+        except OSError:
+            # A read-only data directory just means no snapshot
+            pass
+    return graph
+
+
+def source_signature(directory):
+    """
+    Returns the size and modification time of each source CSV file,
+    which a snapshot must match to be reused.
+    """
+    signature = []
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        signature.append([name, stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def component_labels(count, movie_offsets, movie_people):
+    """
+    Labels each of `count` people with the smallest person index in their
+    connected component, by union-find over every movie's cast.
+    """
+    parent = array("i", range(count))
+
+    def root(person):
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    for movie in range(len(movie_offsets) - 1):
+        start, end = movie_offsets[movie], movie_offsets[movie + 1]
+        if end - start < 2:
+            continue
+        first = root(movie_people[start])
+        for person in movie_people[start + 1:end]:
+            other = root(person)
+            if other != first:
+                # Keep the smaller index as the root so labels are canonical
+                if other < first:
+                    first, other = other, first
+                parent[other] = first
+
+    for person in range(count):
+        parent[person] = parent[parent[person]]
+    return parent
+
+
+def trigrams(name):
+    """
+    Returns the set of three-character substrings of a lowercase name,
+    padded so that its start and end form trigrams of their own.
+    """
+    name = f"  {name} "
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+def trigram_index(names, name_order):
+    """
+    Indexes every distinct lowercase name by its trigrams. Returns the
+    sorted trigrams, and CSR offsets into the name order positions (of
+    each distinct name's first person) containing each trigram.
+    """
+    postings = {}
+    previous = None
+    for position, person in enumerate(name_order):
+        name = names[person].lower()
+        if name == previous:
+            continue
+        previous = name
+        for gram in trigrams(name):
+            if gram not in postings:
+                postings[gram] = array("i")
+            postings[gram].append(position)
+
+    grams = sorted(postings)
+    offsets = array("i", [0])
+    positions = array("i")
+    for gram in grams:
+        positions.extend(postings[gram])
+        offsets.append(len(positions))
+    return grams, offsets, positions
+
+
+def adjacency(pairs, count):
+    """
+    Groups (source, target) index pairs by source into CSR offsets and
+    targets, with each source's targets sorted.
+    """
+    pairs = sorted(pairs)
+    offsets = array("i", [0]) * (count + 1)
+    targets = array("i", [target for _, target in pairs])
+    for source, _ in pairs:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    return offsets, targets
+
+
+def align(position, alignment=8):
+    """
+    Rounds a file position up to a multiple of `alignment`.
+    """
+    return -(-position // alignment) * alignment
+
+
+def map_file(path, magic):
+    """
+    Memory-maps a file written by `write_file`. Returns its header, a
+    memoryview of the file and the position its sections start at, or
+    None if the file is missing, does not start with `magic`, or has a
+    header that is not JSON.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(data)
+    if bytes(view[:len(magic)]) != magic:
+        return None
+    try:
+        length = int.from_bytes(view[len(magic):len(magic) + 8], "little")
+        header = json.loads(
+            str(view[len(magic) + 8:len(magic) + 8 + length], "utf-8")
+        )
+    except ValueError:
+        return None
+    return header, view, align(len(magic) + 8 + length)
+
+
+def write_file(path, magic, header, sections):
+    """
+    Writes `magic`, the length of the JSON `header` as 8 little-endian
+    bytes and the header itself, then each (offset, buffer) in `sections`
+    at that offset from the next 8-byte boundary.
+    """
+    header = json.dumps(header).encode("utf-8")
+    start = align(len(magic) + 8 + len(header))
+
+    # Write to a temporary file first so readers never see a partial file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(magic)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for offset, section in sections:
+            f.write(bytes(start + offset - f.tell()))
+            f.write(memoryview(section).cast("B"))
+    os.replace(temporary, path)
+
+
+def percentile(ordered, percent):
+    """
+    Returns the nearest-rank percentile of a sorted list of samples.
+    """
+    rank = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[rank]
+
+
+def find(table, key):
+    """
+    Returns the position of `key` in a sorted table, or None.
+    """
+    i = bisect_left(table, key)
+    if i < len(table) and table[i] == key:
+        return i
+    return None
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Builds the (movie, person) path from the source to the target
+    through the person where the two searches met.
+    """
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, person = backward[person]
+        path.append((movie, person))
+    return path
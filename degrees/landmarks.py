@@ -0,0 +1,189 @@
+"""
+Landmark distance index for the degrees co-star graph.
+
+A handful of landmark people are chosen and the degrees of separation
+from each of them to every person are stored as one byte per person.
+By the triangle inequality, for any landmark L the distance between
+two people s and t lies between |d(L, s) - d(L, t)| and
+d(L, s) + d(L, t), which bounds degrees of separation instantly and lets
+the search skip people who cannot lie on a shortest path.
+
+Usage: python landmarks.py [directory] [count]
+"""
+
+import math
+import os
+import sys
+
+from graph import (
+    SATURATED, UNREACHED, load_graph, map_file, source_signature, write_file
+)
+
+# Index file kept next to the CSV files
+INDEX = "degrees.landmarks"
+INDEX_MAGIC = b"LANDMARK"
+INDEX_VERSION = 1
+
+# Number of landmarks chosen when building an index
+DEFAULT_COUNT = 16
+
+
+class Landmarks():
+    """
+    Distances from each landmark person to every person in a graph.
+    """
+
+    def __init__(self, people, rows):
+        self.people = people
+        self.rows = rows
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_COUNT):
+        """
+        Chooses `count` landmarks and computes their distance rows.
+
+        The first landmark is the person who starred in the most movies;
+        each following one is the person farthest from all landmarks so
+        far, which spreads landmarks to the edges of the graph where their
+        bounds are tightest.
+        """
+        degree = [
+            graph.person_offsets[p + 1] - graph.person_offsets[p]
+            for p in range(graph.person_count)
+        ]
+        people = []
+        rows = []
+        nearest = None
+        while len(people) < min(count, graph.person_count):
+            if nearest is None:
+                landmark = max(range(graph.person_count),
+                               key=degree.__getitem__)
+            else:
+                candidates = [
+                    p for p in range(graph.person_count)
+                    if nearest[p] != UNREACHED and nearest[p] > 0
+                ]
+                if not candidates:
+                    break
+                landmark = max(candidates,
+                               key=lambda p: (nearest[p], degree[p]))
+
+            row = graph.distances(landmark)
+            people.append(landmark)
+            rows.append(row)
+            if nearest is None:
+                nearest = bytearray(row)
+            else:
+                nearest = bytearray(map(min, nearest, row))
+        return cls(people, rows)
+
+    @classmethod
+    def load(cls, path, graph, signature=None):
+        """
+        Memory-maps an index written by `save`. Returns None if the file is
+        missing, stale, or was built for a different graph.
+        """
+        mapped = map_file(path, INDEX_MAGIC)
+        if mapped is None:
+            return None
+        header, view, start = mapped
+
+        # A corrupt header is treated like a missing index
+        size = graph.person_count
+        try:
+            if (header["version"] != INDEX_VERSION
+                    or header["people"] != size
+                    or (signature is not None
+                        and header["signature"] != signature)):
+                return None
+            people = [graph.person_index(p) for p in header["landmarks"]]
+        except (ValueError, KeyError, TypeError):
+            return None
+        rows = [
+            view[start + i * size:start + (i + 1) * size]
+            for i in range(len(people))
+        ]
+        if None in people or any(len(row) != size for row in rows):
+            return None
+        return cls(people, rows)
+
+    def save(self, path, graph, signature=None):
+        """
+        Writes the index to a file that `load` can memory-map.
+        """
+        size = graph.person_count
+        write_file(path, INDEX_MAGIC, {
+            "version": INDEX_VERSION,
+            "signature": signature,
+            "people": size,
+            "landmarks": [graph.person_ids[p] for p in self.people],
+        }, [(i * size, row) for i, row in enumerate(self.rows)])
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two person indices. The lower bound is infinite when a landmark
+        proves them disconnected, and the upper bound is infinite when no
+        landmark reaches both.
+        """
+        lower, upper = 0, math.inf
+        for row in self.rows:
+            s, t = row[source], row[target]
+            if s == UNREACHED and t == UNREACHED:
+                continue
+            if s == UNREACHED or t == UNREACHED:
+                return math.inf, math.inf
+            lower = max(lower, abs(s - t))
+            # A saturated distance only means at least SATURATED, so it
+            # still gives a lower bound but no upper one
+            if s < SATURATED and t < SATURATED:
+                upper = min(upper, s + t)
+        return lower, upper
+
+    def guide(self, source, target):
+        """
+        Returns the distance row of the landmark giving the tightest lower
+        bound between two connected person indices, or None.
+
+        Rows where either person's distance saturated are left out, as
+        pruning against an inexact distance could skip the shortest path.
+        """
+        rows = [
+            row for row in self.rows
+            if row[source] < SATURATED and row[target] < SATURATED
+        ]
+        if not rows:
+            return None
+        return max(rows, key=lambda row: abs(row[source] - row[target]))
+
+
+def load_landmarks(directory, graph):
+    """
+    Returns the landmark index for a data directory, or None if it has
+    not been built or the CSV files have changed since.
+    """
+    return Landmarks.load(
+        os.path.join(directory, INDEX), graph, source_signature(directory)
+    )
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python landmarks.py [directory] [count]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COUNT
+
+    print("Loading data...")
+    graph = load_graph(directory)
+    print(f"Choosing {count} landmarks...")
+    landmarks = Landmarks.build(graph, count)
+    landmarks.save(
+        os.path.join(directory, INDEX), graph, source_signature(directory)
+    )
+    for person in landmarks.people:
+        print(f"  {graph.person_names[person]} ({graph.person_ids[person]})")
+    print(f"Index written to {os.path.join(directory, INDEX)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Resident degrees query server.
+
+Loads the graph once and answers HTTP GET requests, over TCP or a Unix
+socket, until interrupted:
+
+    /search?q=NAME[&limit=N]      ranked name lookup
+    /path?source=A&target=B       shortest path between two people
+                                  (IMDB ids or unambiguous names)
+    /stats                        request, latency and cache counters
+
+Shortest paths are kept in a bounded LRU cache that also answers the
+reverse query by reversing the cached path.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+from batch import resolve
+from graph import percentile
+
+# Latencies kept per endpoint for percentile reporting
+LATENCY_WINDOW = 1000
+
+
+class PathCache():
+    """
+    Bounded LRU cache of shortest paths by (source, target) person_ids.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.reverse_hits = 0
+        self.misses = 0
+
+    def get(self, source, target):
+        """
+        Returns (True, path) for a cached pair, reversing the path cached
+        for (target, source) if needed, or (False, None) on a miss.
+        """
+        if (source, target) in self.paths:
+            self.paths.move_to_end((source, target))
+            self.hits += 1
+            return True, self.paths[(source, target)]
+        if (target, source) in self.paths:
+            self.paths.move_to_end((target, source))
+            self.reverse_hits += 1
+            path = self.paths[(target, source)]
+            if path is None:
+                return True, None
+            return True, reverse_path(target, path)
+        self.misses += 1
+        return False, None
+
+    def put(self, source, target, path):
+        self.paths[(source, target)] = path
+        self.paths.move_to_end((source, target))
+        while len(self.paths) > self.capacity:
+            self.paths.popitem(last=False)
+
+    def stats(self):
+        return {
+            "size": len(self.paths),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "reverse_hits": self.reverse_hits,
+            "misses": self.misses,
+        }
+
+
+class Server():
+    """
+    Answers queries against the graph loaded into the degrees module.
+    """
+
+    def __init__(self, cache_size):
+        self.cache = PathCache(cache_size)
+        self.started = time.time()
+        self.requests = {}
+        self.latencies = {}
+        self.routes = {
+            "/search": self.search,
+            "/path": self.path,
+            "/stats": self.stats,
+        }
+
+    async def handle(self, reader, writer):
+        """
+        Serves one HTTP request per connection.
+        """
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            status, body = await self.respond(request.decode("latin-1"))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+        except Exception as e:
+            status, body = "500 Internal Server Error", {"error": str(e)}
+
+        payload = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def respond(self, request):
+        """
+        Returns the status line and JSON body answering a request line.
+        """
+        parts = request.split()
+        if len(parts) != 3 or parts[0] != "GET":
+            return "405 Method Not Allowed", {
+                "error": "only GET is supported"
+            }
+        url = urlsplit(parts[1])
+        route = self.routes.get(url.path)
+        if route is None:
+            return "404 Not Found", {
+                "error": f"no such endpoint: {url.path}"
+            }
+
+        query = {
+            key: values[0] for key, values in parse_qs(url.query).items()
+        }
+        start = time.perf_counter()
+        try:
+            status, body = "200 OK", await route(query)
+        except ValueError as e:
+            status, body = "400 Bad Request", {"error": str(e)}
+        except LookupError as e:
+            status, body = "404 Not Found", {"error": str(e)}
+        self.record(url.path, time.perf_counter() - start)
+        return status, body
+
+    async def search(self, query):
+        limit = int(query.get("limit", 10))
+        return await asyncio.get_running_loop().run_in_executor(
+            None, degrees.find_people, parameter(query, "q"), limit
+        )
+
+    async def path(self, query):
+        source = resolve(parameter(query, "source"))
+        target = resolve(parameter(query, "target"))
+        cached, path = self.cache.get(source, target)
+        if not cached:
+            path = await asyncio.get_running_loop().run_in_executor(
+                None, degrees.shortest_path, source, target
+            )
+            self.cache.put(source, target, path)
+
+        result = {"source_id": source, "target_id": target, "cached": cached}
+        if path is None:
+            result["degrees"] = None
+            result["path"] = None
+        else:
+            result["degrees"] = len(path)
+            result["path"] = [
+                {
+                    "movie_id": movie_id,
+                    "title": degrees.graph.movie_titles[
+                        degrees.graph.movie_index(movie_id)
+                    ],
+                    "person_id": person_id,
+                    "name": degrees.graph.person_names[
+                        degrees.graph.person_index(person_id)
+                    ],
+                }
+                for movie_id, person_id in path
+            ]
+        return result
+
+    async def stats(self, query):
+        latency = {}
+        for endpoint, samples in self.latencies.items():
+            ordered = sorted(samples)
+            latency[endpoint] = {
+                "p50": percentile(ordered, 50) * 1000,
+                "p95": percentile(ordered, 95) * 1000,
+                "p99": percentile(ordered, 99) * 1000,
+                "max": ordered[-1] * 1000,
+            }
+        return {
+            "uptime": time.time() - self.started,
+            "requests": self.requests,
+            "latency_ms": latency,
+            "cache": self.cache.stats(),
+        }
+
+    def record(self, endpoint, seconds):
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if endpoint not in self.latencies:
+            self.latencies[endpoint] = deque(maxlen=LATENCY_WINDOW)
+        self.latencies[endpoint].append(seconds)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="degrees.py serve",
+        description="Serve degrees queries from one loaded graph."
+    )
+    parser.add_argument("-d", "--directory", default="large",
+                        help="data directory (default: large)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8050,
+                        help="TCP port to listen on (default: 8050)")
+    parser.add_argument("--socket",
+                        help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--cache-size", type=int, default=10000,
+                        help="paths kept in the LRU cache (default: 10000)")
+    args = parser.parse_args(argv)
+
+    print("Loading data...")
+    degrees.load_data(args.directory)
+    print("Data loaded.")
+
+    try:
+        asyncio.run(serve(Server(args.cache_size), args))
+    except KeyboardInterrupt:
+        pass
+
+
+async def serve(server, args):
+    if args.socket:
+        listener = await asyncio.start_unix_server(server.handle, args.socket)
+        print(f"Serving on {args.socket}")
+    else:
+        listener = await asyncio.start_server(
+            server.handle, args.host, args.port
+        )
+        print(f"Serving on http://{args.host}:{args.port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def parameter(query, name):
+    """
+    Returns a required query string parameter.
+    """
+    if name not in query:
+        raise ValueError(f"missing parameter: {name}")
+    return query[name]
+
+
+def reverse_path(source, path):
+    """
+    Returns the (movie_id, person_id) path from the target back to the
+    source, given the path from `source` to the target.
+    """
+    people = [source] + [person_id for _, person_id in path]
+    return [
+        (path[i][0], people[i]) for i in range(len(path) - 1, -1, -1)
+    ]
@@ -1,4 +1,9 @@
+from collections import Counter, deque
+
+
 class Node():
+    __slots__ = ("state", "parent", "action")
+
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
@@ -7,13 +12,17 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+
+        # Number of nodes in the frontier for each state
+        self.states = Counter()
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] += 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return self.states[state] > 0
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,9 +31,13 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            return self.discard(self.frontier.pop())
+
+    def discard(self, node):
+        self.states[node.state] -= 1
+        if not self.states[node.state]:
+            del self.states[node.state]
+        return node
 
 
 class QueueFrontier(StackFrontier):
@@ -33,6 +46,4 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            return self.discard(self.frontier.popleft())
@@ -15,6 +15,34 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def expression(self, bits):
+        """Returns a Python expression for the sentence's truth in a model
+        m, an integer holding each symbol's truth in the bit given by
+        `bits`."""
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols):
+        """Returns a function evaluating the sentence for a model given as
+        an integer whose bit i holds the truth of symbols[i].
+
+        Functions are cached on the sentence by their generated source, so
+        changing any part of the sentence compiles a new one. Sentences
+        nested too deeply for Python to compile are evaluated by walking
+        the sentence instead.
+        """
+        bits = {symbol: 1 << i for i, symbol in enumerate(symbols)}
+        try:
+            source = f"lambda m: not not {self.expression(bits)}"
+            if getattr(self, "evaluators", None) is None:
+                self.evaluators = {}
+            if source not in self.evaluators:
+                self.evaluators[source] = eval(source)
+        except (SyntaxError, RecursionError, MemoryError):
+            return lambda m: self.evaluate({
+                symbol: bool(m & bit) for symbol, bit in bits.items()
+            })
+        return self.evaluators[source]
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -68,6 +96,12 @@ class Symbol(Sentence):
     def symbols(self):
         return {self.name}
 
+    def expression(self, bits):
+        try:
+            return f"(m & {bits[self.name]})"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
 
 class Not(Sentence):
     def __init__(self, operand):
@@ -92,6 +126,12 @@ class Not(Sentence):
     def symbols(self):
         return self.operand.symbols()
 
+    def expression(self, bits):
+        # Unparenthesized, since every nested parenthesis counts towards
+        # Python's limit on them; operators binding tighter than `not`
+        # parenthesize their operands themselves
+        return f"not {self.operand.expression(bits)}"
+
 
 class And(Sentence):
     def __init__(self, *conjuncts):
@@ -129,6 +169,28 @@ class And(Sentence):
     def symbols(self):
         return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
 
+    def expression(self, bits):
+        conjuncts = self.flattened()
+        if not conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(bits) for conjunct in conjuncts
+        ) + ")"
+
+    def flattened(self):
+        """Returns the conjuncts, with those of nested conjunctions in
+        their place, so a knowledge base grown one And at a time compiles
+        without deep nesting."""
+        conjuncts = []
+        stack = [self]
+        while stack:
+            sentence = stack.pop()
+            if isinstance(sentence, And):
+                stack.extend(reversed(sentence.conjuncts))
+            else:
+                conjuncts.append(sentence)
+        return conjuncts
+
 
 class Or(Sentence):
     def __init__(self, *disjuncts):
@@ -160,6 +222,27 @@ class Or(Sentence):
     def symbols(self):
         return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
 
+    def expression(self, bits):
+        disjuncts = self.flattened()
+        if not disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(bits) for disjunct in disjuncts
+        ) + ")"
+
+    def flattened(self):
+        """Returns the disjuncts, with those of nested disjunctions in
+        their place."""
+        disjuncts = []
+        stack = [self]
+        while stack:
+            sentence = stack.pop()
+            if isinstance(sentence, Or):
+                stack.extend(reversed(sentence.disjuncts))
+            else:
+                disjuncts.append(sentence)
+        return disjuncts
+
 
 class Implication(Sentence):
     def __init__(self, antecedent, consequent):
@@ -191,6 +274,11 @@ class Implication(Sentence):
     def symbols(self):
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
+    def expression(self, bits):
+        antecedent = self.antecedent.expression(bits)
+        consequent = self.consequent.expression(bits)
+        return f"(not {antecedent} or {consequent})"
+
 
 class Biconditional(Sentence):
     def __init__(self, left, right):
@@ -211,10 +299,7 @@ class Biconditional(Sentence):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
@@ -224,40 +309,333 @@ class Biconditional(Sentence):
     def symbols(self):
         return set.union(self.left.symbols(), self.right.symbols())
 
+    def expression(self, bits):
+        left = self.left.expression(bits)
+        right = self.right.expression(bits)
+        return f"((not {left}) is (not {right}))"
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+def model_check(knowledge, query, engine="enumerate"):
+    """Checks if knowledge base entails query.
 
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    The "enumerate" engine checks every model of the symbols, using the
+    sentences compiled to functions of a bitmask model. The "sat"
+    engine instead checks that knowledge ∧ ¬query is unsatisfiable,
+    which scales to far more symbols.
+    """
+    if engine == "sat":
+        return satisfiable(And(knowledge, Not(query))) is None
+    if engine != "enumerate":
+        raise ValueError(f"unknown engine {engine!r}")
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Evaluate both as compiled functions of a model's bits
+    knowledge = knowledge.compile(symbols)
+    query = query.compile(symbols)
+
+    # Check that the query is true in every model of the knowledge base
+    for model in range(2 ** len(symbols)):
+        if knowledge(model) and not query(model):
+            return False
+    return True
+
+
+def satisfiable(sentence):
+    """Returns a model (symbol name to bool) satisfying the sentence, or
+    None if it is unsatisfiable."""
+    cnf = CNF()
+    cnf.add(sentence)
+    assignment = Solver(cnf.clauses, cnf.count).solve()
+    if assignment is None:
+        return None
+    return {
+        name: assignment[variable]
+        for name, variable in cnf.variables.items()
+    }
+
+
+class CNF():
+    """Clauses equisatisfiable with the sentences added, by the Tseitin
+    transformation.
+
+    Variables are numbered from 1 and clauses are lists of literals: a
+    variable for a true literal, its negation for a false one. Each
+    compound subsentence gets a new variable defined to be equivalent to
+    it, so the clauses grow linearly with the sentence instead of
+    exponentially.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.count = 0
+
+        # Variables of symbols by name, and of compound subsentences
+        self.variables = {}
+        self.definitions = {}
+
+    def add(self, sentence):
+        """Adds clauses requiring the sentence to be true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([
+                self.literal(disjunct) for disjunct in sentence.disjuncts
+            ])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def variable(self):
+        self.count += 1
+        return self.count
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to the sentence, adding clauses
+        defining it if needed."""
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(part) for part in sentence.conjuncts]
+            a = self.variable()
+            for part in parts:
+                self.clauses.append([-a, part])
+            self.clauses.append([a] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(part) for part in sentence.disjuncts]
+            a = self.variable()
+            for part in parts:
+                self.clauses.append([a, -part])
+            self.clauses.append([-a] + parts)
+        elif isinstance(sentence, Implication):
+            p = self.literal(sentence.antecedent)
+            q = self.literal(sentence.consequent)
+            a = self.variable()
+            self.clauses.extend([[-a, -p, q], [a, p], [a, -q]])
+        elif isinstance(sentence, Biconditional):
+            p = self.literal(sentence.left)
+            q = self.literal(sentence.right)
+            a = self.variable()
+            self.clauses.extend([
+                [-a, -p, q], [-a, p, -q], [a, p, q], [a, -p, -q]
+            ])
+        else:
+            raise TypeError(f"cannot convert {sentence!r} to CNF")
+        self.definitions[sentence] = a
+        return a
+
+
+class Solver():
+    """A CDCL SAT solver for clauses over variables 1 to count.
+
+    Pure literals are assigned first. The search then decides variables
+    by activity, propagates units by watching two literals per clause,
+    and on a conflict learns a clause (at the first unique implication
+    point) and backjumps to the level where it becomes unit.
+    """
+
+    def __init__(self, clauses, count):
+        self.count = count
+        self.clauses = []
+        self.watches = {}
+        self.value = [None] * (count + 1)
+        self.level = [0] * (count + 1)
+        self.reason = [None] * (count + 1)
+        self.activity = [0.0] * (count + 1)
+        self.phase = [False] * (count + 1)
+        self.bump = 1.0
+        self.trail = []
+        self.levels = []
+        self.head = 0
+        self.conflict = False
+
+        clauses = [
+            sorted(set(clause)) for clause in clauses
+            if not any(-literal in clause for literal in clause)
+        ]
+        for clause in self.pure(clauses):
+            self.watch(clause)
+
+    def pure(self, clauses):
+        """Assigns pure literals and returns the clauses not satisfied."""
+        while True:
+            positive, negative = set(), set()
+            for clause in clauses:
+                for literal in clause:
+                    if literal > 0:
+                        positive.add(literal)
+                    else:
+                        negative.add(-literal)
+            pure = positive - negative
+            pure.update(-variable for variable in negative - positive)
+            if not pure:
+                return clauses
+            for literal in pure:
+                self.assign(literal, None)
+            clauses = [
+                clause for clause in clauses
+                if not any(literal in pure for literal in clause)
+            ]
+
+    def watch(self, clause):
+        """Adds a clause, watching its first two literals."""
+        if not clause:
+            self.conflict = True
+        elif len(clause) == 1:
+            if self.truth(clause[0]) is False:
+                self.conflict = True
+            elif self.truth(clause[0]) is None:
+                self.assign(clause[0], None)
+        else:
+            self.clauses.append(clause)
+            for literal in clause[:2]:
+                self.watches.setdefault(literal, []).append(
+                    len(self.clauses) - 1
+                )
+
+    def truth(self, literal):
+        value = self.value[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.value[variable] = literal > 0
+        self.level[variable] = len(self.levels)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def solve(self):
+        """Returns a list of variable values indexed by variable, or None
+        if the clauses are unsatisfiable."""
+        if self.conflict:
+            return None
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.levels:
+                    return None
+                learned, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watch(learned)
+                    self.assign(learned[0], len(self.clauses) - 1)
+                self.bump /= 0.95
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                return self.value
+            self.levels.append(len(self.trail))
+            self.assign(variable if self.phase[variable] else -variable, None)
+
+    def propagate(self):
+        """Assigns literals implied by unit clauses, returning the index of
+        a clause made false, or None."""
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches.get(false, [])
+            i = 0
+            while i < len(watchers):
+                index = watchers[i]
+                clause = self.clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.truth(clause[0]) is True:
+                    i += 1
+                    continue
+
+                # Watch another literal that is not false, if there is one
+                for k in range(2, len(clause)):
+                    if self.truth(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(index)
+                        watchers[i] = watchers[-1]
+                        watchers.pop()
+                        break
+                else:
+                    if self.truth(clause[0]) is False:
+                        return index
+                    self.assign(clause[0], index)
+                    i += 1
+        return None
+
+    def analyze(self, conflict):
+        """Returns the clause learned from a conflict, its asserting literal
+        first, and the level to backjump to."""
+        current = len(self.levels)
+        learned = [None]
+        seen = set()
+        pending = 0
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for literal in clause:
+                variable = abs(literal)
+                if variable in seen or self.level[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.activity[variable] += self.bump
+                if self.level[variable] == current:
+                    pending += 1
+                else:
+                    learned.append(literal)
+
+            # Resolve on the latest assigned literal of the current level
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if not pending:
+                break
+            clause = self.clauses[self.reason[abs(literal)]]
+        learned[0] = -literal
+
+        if self.bump > 1e100:
+            self.activity = [activity / 1e100 for activity in self.activity]
+            self.bump /= 1e100
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal that was assigned last after the asserting one
+        deepest = max(
+            range(1, len(learned)),
+            key=lambda i: self.level[abs(learned[i])]
+        )
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def backjump(self, level):
+        """Undoes every assignment above a decision level."""
+        start = self.levels[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phase[variable] = self.value[variable]
+            self.value[variable] = None
+            self.reason[variable] = None
+        del self.trail[start:]
+        del self.levels[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity."""
+        best = None
+        for variable in range(1, self.count + 1):
+            if self.value[variable] is None and (
+                best is None or self.activity[variable] > self.activity[best]
+            ):
+                best = variable
+        return best
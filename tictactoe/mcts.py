@@ -0,0 +1,291 @@
+"""
+Monte Carlo tree search player for m,n,k tic-tac-toe.
+
+Rather than evaluating positions by hand, the player grows a search tree
+by UCT: it walks down the tree picking moves by their upper confidence
+bound, adds one new position, and scores it with a random playout on
+bitboards. The most visited move is played. The tree is kept between
+moves, so the part of it still reachable after both players have moved
+is reused. Playouts can also be split between worker processes, whose
+statistics for the root moves are added together.
+"""
+
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Playouts per move when neither a playout nor a time budget is given
+DEFAULT_PLAYOUTS = 2000
+
+
+class Node():
+    """
+    A position in the search tree, reached by `player` (0 for X, 1 for O)
+    marking `move`. `wins` counts the playouts through it that player
+    won, with draws counting half.
+    """
+    __slots__ = (
+        "move", "parent", "player", "children", "untried", "visits", "wins",
+        "terminal", "winner"
+    )
+
+    def __init__(self, move, parent, player, untried, terminal, winner):
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0
+        self.terminal = terminal
+        self.winner = winner
+
+
+class MCTS():
+    """
+    A UCT player for a mnk.Game.
+
+    Each move runs up to `playouts` playouts and for up to `time_limit`
+    seconds, stopping early if `stop()` returns True; without either
+    budget it runs DEFAULT_PLAYOUTS. With more than one worker, the
+    playouts are split between that many processes, each growing its own
+    tree, and the tree is not kept between moves. The processes are
+    started on the first move and kept until `close()`, which a `with`
+    block calls on exit.
+    """
+
+    def __init__(self, game, playouts=None, time_limit=None, stop=None,
+                 exploration=math.sqrt(2), workers=1, seed=None):
+        self.game = game
+        if playouts is None and time_limit is None:
+            playouts = DEFAULT_PLAYOUTS
+        self.playout_limit = playouts
+        self.time_limit = time_limit
+        self.stop = stop
+        self.exploration = exploration
+        self.workers = workers
+        self.random = random.Random(seed)
+
+        # Tree kept from the last move, and the bitboard at its root
+        self.root = None
+        self.root_bits = None
+
+        # Playouts run for the last move
+        self.playouts = 0
+
+        # Worker processes, started by the first parallel move
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shuts down the worker processes, if any were started.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def best_move(self, bits):
+        """
+        Returns the most visited cell after searching from a bitboard, or
+        None if the game is over.
+        """
+        if self.game.terminal(bits):
+            return None
+        if self.workers > 1:
+            statistics = self.parallel_statistics(bits)
+        else:
+            statistics = self.statistics(bits)
+        return max(
+            statistics,
+            key=lambda cell: (statistics[cell][0], statistics[cell][1], -cell)
+        )
+
+    def statistics(self, bits):
+        """
+        Grows the tree from a bitboard within the budget and returns the
+        (visits, wins) of each root move.
+        """
+        root = self.reuse(bits)
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+
+        self.playouts = 0
+        while self.playout_limit is None or self.playouts < self.playout_limit:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if self.stop is not None and self.stop():
+                break
+            self.playout(root, bits)
+            self.playouts += 1
+
+        # Every root move needs a visit before one can be chosen
+        while root.untried:
+            self.playout(root, bits)
+            self.playouts += 1
+        return {
+            child.move: (child.visits, child.wins) for child in root.children
+        }
+
+    def parallel_statistics(self, bits):
+        """
+        Returns the (visits, wins) of each root move, added up over
+        `workers` processes searching independently.
+        """
+        playouts = self.playout_limit
+        if playouts is not None:
+            playouts = -(-playouts // self.workers)
+        seed = self.random.randrange(2 ** 32)
+
+        # Workers get a wall-clock deadline rather than the time limit, so
+        # the time taken to hand them the move comes out of their budget
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.time() + self.time_limit
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers)
+        results = list(self.pool.map(
+            worker_statistics,
+            [self.game] * self.workers,
+            [bits] * self.workers,
+            [playouts] * self.workers,
+            [deadline] * self.workers,
+            [self.exploration] * self.workers,
+            [seed + worker for worker in range(self.workers)],
+        ))
+
+        self.playouts = 0
+        statistics = {}
+        for result, playouts in results:
+            self.playouts += playouts
+            for cell, (visits, wins) in result.items():
+                total = statistics.get(cell, (0, 0))
+                statistics[cell] = (total[0] + visits, total[1] + wins)
+        return statistics
+
+    def reuse(self, bits):
+        """
+        Returns the node for a bitboard from the tree kept since the last
+        move, or a new root if the position is not in it.
+        """
+        node = self.root
+        if node is not None:
+            x, o = bits
+            root_x, root_o = self.root_bits
+            if root_x & ~x or root_o & ~o:
+                node = None
+            new = ((x & ~root_x), (o & ~root_o))
+            while node is not None and (new[0] or new[1]):
+                # Follow the move the player to move here has since made
+                player = 1 - node.player
+                node = next((
+                    child for child in node.children
+                    if new[player] >> child.move & 1
+                ), None)
+                if node is not None:
+                    cells = list(new)
+                    cells[player] &= ~(1 << node.move)
+                    new = tuple(cells)
+
+        if node is None:
+            x, o = bits
+            player = 1 - (x | o).bit_count() % 2
+            node = Node(None, None, player, self.untried(bits), False, None)
+        node.parent = None
+        self.root, self.root_bits = node, bits
+        return node
+
+    def untried(self, bits):
+        """
+        Returns the empty cells of a bitboard in a random order.
+        """
+        cells = self.game.actions(bits)
+        self.random.shuffle(cells)
+        return cells
+
+    def playout(self, root, bits):
+        """
+        Selects a path down the tree, expands it by one position, plays
+        randomly to the end of the game and records the result.
+        """
+        game = self.game
+        cells = list(bits)
+        node = root
+
+        # Select by upper confidence bound while every move has been tried
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            exploration = self.exploration
+            node = max(node.children, key=lambda child: (
+                child.wins / child.visits
+                + exploration * math.sqrt(log_visits / child.visits)
+            ))
+            cells[node.player] |= 1 << node.move
+
+        # Expand one untried move
+        if node.untried and not node.terminal:
+            cell = node.untried.pop()
+            player = 1 - node.player
+            cells[player] |= 1 << cell
+            if game.completes(cells[player], cell):
+                child = Node(cell, node, player, [], True, player)
+            elif cells[0] | cells[1] == game.full:
+                child = Node(cell, node, player, [], True, None)
+            else:
+                child = Node(
+                    cell, node, player, self.untried(tuple(cells)), False,
+                    None
+                )
+            node.children.append(child)
+            node = child
+
+        # Play the rest of the game at random
+        if node.terminal:
+            winner = node.winner
+        else:
+            winner = self.simulate(cells, 1 - node.player)
+
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1
+            node = node.parent
+
+    def simulate(self, cells, player):
+        """
+        Plays random moves from `cells` ([x, o]) with `player` to move,
+        and returns the winning player, or None for a draw.
+        """
+        game = self.game
+        occupied = cells[0] | cells[1]
+        empty = [cell for cell in range(game.size) if not occupied >> cell & 1]
+        self.random.shuffle(empty)
+        for cell in empty:
+            cells[player] |= 1 << cell
+            if game.completes(cells[player], cell):
+                return player
+            player = 1 - player
+        return None
+
+
+def worker_statistics(game, bits, playouts, deadline, exploration, seed):
+    """
+    Returns one worker's (visits, wins) for each root move and the number
+    of playouts it ran before the time.time() `deadline`, if there is one.
+    """
+    time_limit = None
+    if deadline is not None:
+        time_limit = max(0, deadline - time.time())
+    player = MCTS(game, playouts, time_limit, exploration=exploration,
+                  seed=seed)
+    statistics = player.statistics(bits)
+    return statistics, player.playouts
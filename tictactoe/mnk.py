@@ -0,0 +1,696 @@
+"""
+Tic-tac-toe on any m by n board, won by k in a row.
+
+Positions are bitboards (x, o) like those of tictactoe.py, with cell
+(i, j) as bit n * i + j. Beyond 3x3 a full minimax search is out of
+reach, so moves are chosen by iterative-deepening alpha-beta search:
+each depth is searched in turn until the game is solved or a time budget
+runs out. Moves are ordered by the transposition table, killer moves and
+history scores, and positions at the depth cutoff are scored by the
+lines each player could still complete. ParallelSearch splits the moves
+at the root of each depth between worker processes.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from tictactoe import EMPTY, EXACT, LOWER, O, UPPER, X, Stats
+
+# Value of a won position, less the plies it takes to win
+WIN = 10 ** 9
+
+# Values beyond this are forced wins or losses rather than evaluations
+WON = WIN - 10 ** 6
+
+# Nodes searched between checks of the clock and stop callback
+CHECK_INTERVAL = 1024
+
+# Seconds between checks of the clock while waiting for workers
+POLL_INTERVAL = 0.01
+
+
+class Timeout(Exception):
+    """
+    Raised inside a search when its time budget runs out or it is stopped.
+    """
+
+
+class Game():
+    """
+    The rules of an m by n board won by k in a row.
+    """
+
+    def __init__(self, m=3, n=3, k=3):
+        if m < 1 or n < 1 or not 0 < k <= max(m, n):
+            raise ValueError(f"invalid board {m}x{n} with {k} in a row")
+        self.m, self.n, self.k = m, n, k
+        self.size = m * n
+        self.full = (1 << self.size) - 1
+        self.windows = windows(m, n, k)
+
+        # Windows through each cell, the only ones a move there can complete
+        self.lines = [
+            tuple(window for window in self.windows if window >> cell & 1)
+            for cell in range(self.size)
+        ]
+
+        # Cells from the centre outwards, the default order to try moves
+        self.central = sorted(range(self.size), key=lambda cell: (
+            abs(cell // n - (m - 1) / 2) + abs(cell % n - (n - 1) / 2), cell
+        ))
+        self.rank = [0] * self.size
+        for rank, cell in enumerate(self.central):
+            self.rank[cell] = rank
+
+        # Evaluation of a window holding a number of one player's marks
+        self.weights = [0] + [4 ** count for count in range(k)]
+
+        # Indexes of the windows through each cell, and the evaluation for
+        # X of a window holding x of X's marks and o of O's, by the window's
+        # count x * (k + 1) + o
+        self.through = [
+            [index for index, window in enumerate(self.windows)
+             if window >> cell & 1]
+            for cell in range(self.size)
+        ]
+        self.values = [
+            self.weights[x] if not o else -self.weights[o] if not x else 0
+            for x in range(k + 1) for o in range(k + 1)
+        ]
+
+    def __repr__(self):
+        return f"Game({self.m}, {self.n}, {self.k})"
+
+    def initial_state(self):
+        return (0, 0)
+
+    def player(self, bits):
+        """
+        Returns player who has the next turn on a bitboard.
+        """
+        x, o = bits
+        return X if x.bit_count() <= o.bit_count() else O
+
+    def actions(self, bits):
+        """
+        Returns the empty cells of a bitboard, in increasing order.
+        """
+        free = self.full & ~(bits[0] | bits[1])
+        return [cell for cell in range(self.size) if free >> cell & 1]
+
+    def result(self, bits, cell):
+        """
+        Returns the bitboard that results from the current player marking
+        `cell`.
+        """
+        x, o = bits
+        move = 1 << cell
+        if not 0 <= cell < self.size or (x | o) & move:
+            raise ValueError(f"invalid action {divmod(cell, self.n)}")
+        if self.player(bits) == X:
+            return x | move, o
+        return x, o | move
+
+    def winner(self, bits):
+        """
+        Returns the winner of the game on a bitboard, if there is one.
+        """
+        x, o = bits
+        for window in self.windows:
+            if x & window == window:
+                return X
+            if o & window == window:
+                return O
+        return None
+
+    def terminal(self, bits):
+        """
+        Returns True if the game on a bitboard is over, False otherwise.
+        """
+        return (bits[0] | bits[1]) == self.full or self.winner(bits) is not None
+
+    def utility(self, bits):
+        """
+        Returns 1 if X has won on a bitboard, -1 if O has won, 0 otherwise.
+        """
+        return {X: 1, O: -1, None: 0}[self.winner(bits)]
+
+    def completes(self, cells, cell):
+        """
+        Returns True if a player holding `cells` has k in a row through
+        `cell`.
+        """
+        for window in self.lines[cell]:
+            if cells & window == window:
+                return True
+        return False
+
+    def score(self, mine, theirs):
+        """
+        Returns a heuristic value for the player holding `mine`, counting
+        the windows each player could still fill, weighted by how many of
+        the window's cells they already hold.
+        """
+        weights = self.weights
+        total = 0
+        for window in self.windows:
+            if not window & theirs:
+                total += weights[(window & mine).bit_count()]
+            elif not window & mine:
+                total -= weights[(window & theirs).bit_count()]
+        return total
+
+    def evaluate(self, bits):
+        """
+        Returns the heuristic value of a bitboard for X.
+        """
+        return self.score(*bits)
+
+    def board(self, bits):
+        """
+        Returns the list of lists board for a bitboard.
+        """
+        x, o = bits
+        board = [[EMPTY] * self.n for _ in range(self.m)]
+        for cell in range(self.size):
+            if x >> cell & 1:
+                board[cell // self.n][cell % self.n] = X
+            elif o >> cell & 1:
+                board[cell // self.n][cell % self.n] = O
+        return board
+
+    def bitboard(self, board):
+        """
+        Returns the bitboard for a list of lists board.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell == X:
+                    x |= 1 << (self.n * i + j)
+                elif cell == O:
+                    o |= 1 << (self.n * i + j)
+        return x, o
+
+    def best_move(self, bits, time_limit=None, max_depth=None, stop=None,
+                  workers=1, stats=None):
+        """
+        Returns the best cell found for the current player within
+        `time_limit` seconds and `max_depth` plies (both unlimited by
+        default), or None if the game is over. With more than one worker
+        the search runs in that many processes. Counters describing the
+        search are added to `stats`, a tictactoe.Stats, if one is given.
+        """
+        if workers > 1:
+            search = ParallelSearch(
+                self, time_limit, max_depth, stop, workers=workers,
+                stats=stats
+            )
+        else:
+            search = Search(self, time_limit, max_depth, stop, stats=stats)
+        return search.run(bits)
+
+
+class Position():
+    """
+    A mutable position on which the search plays moves and takes them back
+    in place, keeping the move count, the empty cells and the evaluation
+    up to date instead of building a new position for every node.
+    """
+
+    def __init__(self, game, bits=(0, 0)):
+        x, o = bits
+        self.game = game
+        self.cells = [x, o]
+        self.count = (x | o).bit_count()
+
+        # Each window's count of marks (see Game.values), and the
+        # evaluation of the position for X
+        self.counts = [
+            (window & x).bit_count() * (game.k + 1) + (window & o).bit_count()
+            for window in game.windows
+        ]
+        self.score = sum(game.values[count] for count in self.counts)
+
+        # Empty cells, and each cell's index in that list while it is empty
+        self.empty = [
+            cell for cell in game.central if not (x | o) >> cell & 1
+        ]
+        self.slots = [0] * game.size
+        for slot, cell in enumerate(self.empty):
+            self.slots[cell] = slot
+
+        # Cells played on this position, to take back in order
+        self.played = []
+
+    @property
+    def bits(self):
+        return self.cells[0], self.cells[1]
+
+    def play(self, cell):
+        """
+        Marks `cell` for the player to move and returns True if that
+        completes k in a row.
+        """
+        game = self.game
+        side = self.count & 1
+        self.cells[side] |= 1 << cell
+        self.count += 1
+        self.played.append(cell)
+
+        step = 1 if side else game.k + 1
+        counts = self.counts
+        values = game.values
+        score = self.score
+        for window in game.through[cell]:
+            count = counts[window]
+            counts[window] = count + step
+            score += values[count + step] - values[count]
+        self.score = score
+
+        # Fill the cell's slot with the last empty cell
+        last = self.empty.pop()
+        if last != cell:
+            slot = self.slots[cell]
+            self.empty[slot] = last
+            self.slots[last] = slot
+        return game.completes(self.cells[side], cell)
+
+    def undo(self):
+        """
+        Takes back the last move played, restoring the empty cells to
+        their order before it.
+        """
+        game = self.game
+        cell = self.played.pop()
+        self.count -= 1
+        side = self.count & 1
+        self.cells[side] ^= 1 << cell
+
+        step = 1 if side else game.k + 1
+        counts = self.counts
+        values = game.values
+        score = self.score
+        for window in game.through[cell]:
+            count = counts[window]
+            counts[window] = count - step
+            score += values[count - step] - values[count]
+        self.score = score
+
+        slot = self.slots[cell]
+        if slot < len(self.empty):
+            moved = self.empty[slot]
+            self.slots[moved] = len(self.empty)
+            self.empty.append(moved)
+            self.empty[slot] = cell
+        else:
+            self.empty.append(cell)
+
+
+class Search():
+    """
+    An iterative-deepening alpha-beta search for the player to move.
+
+    The search stops after `time_limit` seconds, after `max_depth` plies,
+    or as soon as `stop()` returns True, and always completes at least
+    depth 1. Afterwards `move` holds the best cell, `value` its value for
+    the player to move, `depth` the deepest search completed and `nodes`
+    the positions visited. More counters are added to `stats`, a
+    tictactoe.Stats, if one is given.
+    """
+
+    def __init__(self, game, time_limit=None, max_depth=None, stop=None,
+                 table=None, stats=None):
+        self.game = game
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.stop = stop
+        self.stats = stats
+
+        # Maps positions to (depth, value, bound, best cell)
+        self.table = {} if table is None else table
+
+        # Cells that last caused cutoffs at each ply, and cutoffs by cell
+        self.killers = []
+        self.history = [0] * game.size
+
+        self.position = None
+        self.deadline = None
+        self.nodes = 0
+        self.depth = 0
+        self.value = None
+        self.move = None
+
+    def run(self, bits):
+        """
+        Searches the bitboard one ply deeper at a time and returns the
+        best cell found, or None if the game is over.
+        """
+        game = self.game
+        if game.terminal(bits):
+            return None
+        start = time.perf_counter()
+        if self.time_limit is not None:
+            self.deadline = start + self.time_limit
+
+        self.position = Position(game, bits)
+        limit = len(self.position.empty)
+        if self.max_depth is not None:
+            limit = min(limit, self.max_depth)
+        for depth in range(1, limit + 1):
+            try:
+                value, move = self.root(depth)
+            except Timeout:
+                break
+            self.depth, self.value, self.move = depth, value, move
+            if abs(value) >= WON:
+                break
+
+        if self.stats is not None:
+            self.stats.nodes += self.nodes
+            self.stats.seconds += time.perf_counter() - start
+        return self.move
+
+    def root(self, depth):
+        """
+        Returns the value and best cell of the root at `depth`, preferring
+        the lowest cell among equally good moves.
+        """
+        position = self.position
+        best_value, best_move = -WIN, None
+        for cell in self.ordered(self.move, 0):
+            if position.play(cell):
+                value = WIN - 1
+            else:
+                # Search just below the best value so ties come back exact
+                value, _ = self.negamax(depth - 1, -WIN, 1 - best_value, 1)
+                value = -value
+            position.undo()
+            if value > best_value or (value == best_value and cell < best_move):
+                best_value, best_move = value, cell
+        return best_value, best_move
+
+    def negamax(self, depth, alpha, beta, ply):
+        """
+        Returns the value of the position for the player to move and a
+        best cell, searching `depth` plies between `alpha` and `beta`.
+        Values outside that window are only bounds.
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self.check()
+        if self.stats is not None and ply > self.stats.max_depth:
+            self.stats.max_depth = ply
+        position = self.position
+        if not position.empty:
+            return 0, None
+        if depth == 0:
+            if position.count & 1:
+                return -position.score, None
+            return position.score, None
+
+        # Only reuse results for the same depth, so a search's value does
+        # not depend on what the table held when it started
+        key = position.cells[0] << self.game.size | position.cells[1]
+        entry = self.table.get(key)
+        preferred = None
+        if entry is not None:
+            stored, value, bound, preferred = entry
+            if stored == depth:
+                value = from_table(value, ply)
+                if (bound == EXACT
+                        or (bound == LOWER and value >= beta)
+                        or (bound == UPPER and value <= alpha)):
+                    if self.stats is not None:
+                        self.stats.table_hits += 1
+                    return value, preferred
+
+        window = alpha
+        best_value, best_move = -WIN, None
+        for cell in self.ordered(preferred, ply):
+            if position.play(cell):
+                value = WIN - ply - 1
+            else:
+                value, _ = self.negamax(depth - 1, -beta, -alpha, ply + 1)
+                value = -value
+            position.undo()
+            if value > best_value:
+                best_value, best_move = value, cell
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    self.cutoff(cell, depth, ply)
+                    break
+
+        if best_value <= window:
+            bound = UPPER
+        elif best_value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table[key] = (depth, to_table(best_value, ply), bound, best_move)
+        return best_value, best_move
+
+    def ordered(self, preferred, ply):
+        """
+        Returns the empty cells in the order to search them: the table's
+        best cell, then killer moves, then by history score and closeness
+        to the centre.
+        """
+        history = self.history
+        rank = self.game.rank
+        size = self.game.size
+        moves = sorted(
+            self.position.empty,
+            key=lambda cell: rank[cell] - history[cell] * size
+        )
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        cells = self.position.cells
+        occupied = cells[0] | cells[1]
+        first = []
+        for cell in (preferred, *killers):
+            if (cell is not None and not occupied >> cell & 1
+                    and cell not in first):
+                first.append(cell)
+        if not first:
+            return moves
+        return first + [cell for cell in moves if cell not in first]
+
+    def cutoff(self, cell, depth, ply):
+        """
+        Records a move that caused a beta cutoff.
+        """
+        if self.stats is not None:
+            self.stats.cutoff(ply)
+        self.history[cell] += depth * depth
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if cell not in killers:
+            killers.insert(0, cell)
+            del killers[2:]
+
+    def check(self):
+        """
+        Raises Timeout if the search should stop. Depth 1 always finishes,
+        so there is a move to return.
+        """
+        if not self.depth:
+            return
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise Timeout
+        if self.stop is not None and self.stop():
+            raise Timeout
+
+
+class ParallelSearch(Search):
+    """
+    A Search that splits the moves at the root between a pool of
+    `workers` processes, by default one per CPU.
+
+    Workers share the best value found so far and search each move just
+    below it, so a move that ties the best still gets its exact value and
+    the lowest of equally good cells wins, as in the sequential search.
+    Each depth therefore returns the same move as Search would.
+    """
+
+    def __init__(self, game, time_limit=None, max_depth=None, stop=None,
+                 workers=None, stats=None):
+        super().__init__(game, time_limit, max_depth, stop, stats=stats)
+        self.workers = workers or os.cpu_count()
+        self.best = None
+        self.stopped = None
+        self.pool = None
+
+    def run(self, bits):
+        if self.game.terminal(bits):
+            return None
+        self.best = multiprocessing.Value("q", -WIN)
+        self.stopped = multiprocessing.Value("b", 0)
+        with ProcessPoolExecutor(
+            self.workers, initializer=start_worker,
+            initargs=(
+                self.game, self.best, self.stopped, self.stats is not None
+            )
+        ) as self.pool:
+            return super().run(bits)
+
+    def root(self, depth):
+        self.best.value = -WIN
+        bits = self.position.bits
+        futures = {
+            self.pool.submit(
+                search_root_move, bits, cell, depth, self.depth
+            ): cell
+            for cell in self.ordered(self.move, 0)
+        }
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(
+                    pending, POLL_INTERVAL, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    # Raises Timeout if the worker was stopped
+                    future.result()
+                self.check()
+        except Timeout:
+            self.stopped.value = 1
+            for future in pending:
+                future.cancel()
+            raise
+
+        best_value, best_move = -WIN, None
+        for future, cell in futures.items():
+            value, nodes, stats = future.result()
+            self.nodes += nodes
+            if stats is not None:
+                self.stats.add(stats)
+            if value > best_value or (value == best_value and cell < best_move):
+                best_value, best_move = value, cell
+        return best_value, best_move
+
+
+class SearchThread():
+    """
+    Runs a Search from a bitboard on a background thread, so that a caller
+    such as the runner can keep drawing while the computer thinks. The
+    search can be cancelled, and its progress read while it runs.
+    """
+
+    def __init__(self, game, bits, time_limit=None):
+        self.cancelled = threading.Event()
+        self.search = Search(game, time_limit, stop=self.cancelled.is_set)
+        self.move = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self.thread = threading.Thread(
+            target=self.run, args=(bits,), daemon=True
+        )
+        self.thread.start()
+
+    def run(self, bits):
+        self.move = self.search.run(bits)
+        self.finished = time.perf_counter()
+
+    def done(self):
+        return self.finished is not None
+
+    def cancel(self):
+        """
+        Asks the search to stop; it returns its best move so far.
+        """
+        self.cancelled.set()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def nodes(self):
+        return self.search.nodes
+
+
+# Search run by each root search worker process, the best root value
+# shared between them, and whether to count Stats for the parent search
+worker = None
+shared_best = None
+instrumented = False
+
+
+def start_worker(game, best, stopped, counting):
+    global worker, shared_best, instrumented
+    worker = Search(game, stop=lambda: stopped.value)
+    shared_best = best
+    instrumented = counting
+
+
+def search_root_move(bits, cell, depth, completed):
+    """
+    Returns the value of root move `cell` at `depth` for the player to
+    move on a bitboard, exact if it is at least the best value shared by
+    the other workers, the nodes searched, and the search's Stats if the
+    parent search is instrumented.
+    """
+    search = worker
+    search.nodes = 0
+    if instrumented:
+        search.stats = Stats()
+
+    # Lets the stop flag interrupt the search once depth 1 is complete
+    search.depth = completed
+
+    search.position = Position(search.game, bits)
+    if search.position.play(cell):
+        value = WIN - 1
+    else:
+        value, _ = search.negamax(depth - 1, -WIN, 1 - shared_best.value, 1)
+        value = -value
+    with shared_best.get_lock():
+        if value > shared_best.value:
+            shared_best.value = value
+    return value, search.nodes, search.stats
+
+
+def windows(m, n, k):
+    """
+    Returns the cells of every line of k cells on an m by n board, as
+    bitmasks: rows, columns and both diagonals.
+    """
+    masks = []
+    for i in range(m):
+        for j in range(n):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                if 0 <= end_i < m and 0 <= end_j < n:
+                    masks.append(sum(
+                        1 << (n * (i + di * step) + j + dj * step)
+                        for step in range(k)
+                    ))
+    return masks
+
+
+def to_table(value, ply):
+    """
+    Returns a value relative to the root as stored in the transposition
+    table: forced wins and losses counted in plies from the position.
+    """
+    if value >= WON:
+        return value + ply
+    if value <= -WON:
+        return value - ply
+    return value
+
+
+def from_table(value, ply):
+    """
+    Returns a value read from the transposition table at `ply` relative
+    to the root.
+    """
+    if value >= WON:
+        return value - ply
+    if value <= -WON:
+        return value + ply
+    return value
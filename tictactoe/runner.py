@@ -2,8 +2,19 @@ import pygame
 import sys
 import time
 
+import mnk
 import tictactoe as ttt
 
+# Board size, marks in a row to win, and seconds the computer may think,
+# from python runner.py [m n k [seconds]]
+if len(sys.argv) not in [1, 4, 5]:
+    sys.exit("Usage: python runner.py [m n k [seconds]]")
+m, n, k = 3, 3, 3
+if len(sys.argv) > 1:
+    m, n, k = (int(arg) for arg in sys.argv[1:4])
+time_limit = float(sys.argv[4]) if len(sys.argv) > 4 else 2.0
+game = mnk.Game(m, n, k)
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -13,18 +24,27 @@ white = (255, 255, 255)
 
 screen = pygame.display.set_mode(size)
 
+# Tiles shrink to fit larger boards between the title and the buttons
+tile_size = min(80, (height - 160) // m, (width - 40) // n)
+
+smallFont = pygame.font.Font("OpenSans-Regular.ttf", 18)
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
+board = game.initial_state()
 ai_turn = False
 
+# Background search for the computer's move, while it is thinking
+thinking = None
+
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if thinking is not None:
+                thinking.cancel()
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +87,13 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (n / 2 * tile_size),
+                       height / 2 - (m / 2 * tile_size))
+        cells = game.board(board)
         tiles = []
-        for i in range(3):
+        for i in range(m):
             row = []
-            for j in range(3):
+            for j in range(n):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -81,20 +101,20 @@ while True:
                 )
                 pygame.draw.rect(screen, white, rect, 3)
 
-                if board[i][j] != ttt.EMPTY:
-                    move = moveFont.render(board[i][j], True, white)
+                if cells[i][j] != ttt.EMPTY:
+                    move = moveFont.render(cells[i][j], True, white)
                     moveRect = move.get_rect()
                     moveRect.center = rect.center
                     screen.blit(move, moveRect)
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = game.terminal(board)
+        player = game.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = game.winner(board)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -108,13 +128,31 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Show the search's progress while the computer is thinking
+        if thinking is not None:
+            progress = smallFont.render(
+                f"{thinking.elapsed:.1f}s, {thinking.nodes} nodes searched",
+                True, white
+            )
+            progressRect = progress.get_rect()
+            progressRect.center = ((width / 2), height - 30)
+            screen.blit(progress, progressRect)
+
+        # Check for AI move, searched in the background so the window
+        # keeps responding
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+            if thinking is not None:
+                if thinking.done():
+                    board = game.result(board, thinking.move)
+                    thinking = None
+                    ai_turn = False
+            elif ai_turn:
+                if (m, n, k) == (3, 3, 3):
+                    # The solved 3x3 game needs no search
+                    board = game.result(board, ttt.bitboard_minimax(board))
+                    ai_turn = False
+                else:
+                    thinking = mnk.SearchThread(game, board, time_limit)
             else:
                 ai_turn = True
 
@@ -122,10 +160,10 @@ while True:
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
+            for i in range(m):
+                for j in range(n):
+                    if (cells[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
+                        board = game.result(board, n * i + j)
 
         if game_over:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
@@ -140,7 +178,7 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
+                    board = game.initial_state()
                     ai_turn = False
 
     pygame.display.flip()
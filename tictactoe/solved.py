@@ -0,0 +1,128 @@
+"""
+Solved-game table for tic-tac-toe.
+
+Every position reachable from the empty board is solved once by full
+minimax, and its value and best cell are written as one byte per base 3
+position index (see tictactoe.position_index). With the table built,
+tictactoe.minimax answers by lookup instead of searching. Ties between
+equally good cells go to the lowest cell, so building is deterministic.
+
+Usage: python solved.py [build|verify]
+"""
+
+import sys
+
+from tictactoe import (
+    NO_MOVE, TABLE, TABLE_MAGIC, TABLE_VERSION, UNREACHABLE,
+    TranspositionTable, bitboard_actions, bitboard_result, bitboard_terminal,
+    bitboard_utility, load_table, position_index, search
+)
+
+
+def solve():
+    """
+    Returns a dictionary mapping every reachable bitboard to its value
+    (1 if X wins with best play, -1 if O wins, 0 for a tie) and best cell,
+    or None for a finished game.
+    """
+    solutions = {}
+
+    def value(bits):
+        if bits not in solutions:
+            if bitboard_terminal(bits):
+                solutions[bits] = (bitboard_utility(bits), None)
+            else:
+                maximizing = bits[0].bit_count() <= bits[1].bit_count()
+                best = None
+                for cell in bitboard_actions(bits):
+                    child = value(bitboard_result(bits, cell))
+                    if (best is None
+                            or (maximizing and child > best[0])
+                            or (not maximizing and child < best[0])):
+                        best = (child, cell)
+                solutions[bits] = best
+        return solutions[bits][0]
+
+    value((0, 0))
+    return solutions
+
+
+def build():
+    """
+    Returns the table entries for every position index.
+    """
+    entries = bytearray([UNREACHABLE]) * 3 ** 9
+    for bits, (value, cell) in solve().items():
+        move = NO_MOVE if cell is None else cell
+        entries[position_index(bits)] = (value + 1) << 4 | move
+    return bytes(entries)
+
+
+def save(entries, path=TABLE):
+    with open(path, "wb") as f:
+        f.write(TABLE_MAGIC + bytes([TABLE_VERSION]) + entries)
+
+
+def verify(entries):
+    """
+    Returns a list of problems found by checking the table against a live
+    alpha-beta search of every reachable position.
+    """
+    problems = []
+    table = TranspositionTable()
+    solutions = solve()
+    for bits in sorted(solutions):
+        entry = entries[position_index(bits)]
+        value, move = (entry >> 4) - 1, entry & NO_MOVE
+        if entry == UNREACHABLE:
+            problems.append(f"{bits}: missing")
+            continue
+        expected, _ = search(bits, -2, 2, table)
+        if value != expected:
+            problems.append(f"{bits}: value {value}, search {expected}")
+        if bitboard_terminal(bits):
+            if move != NO_MOVE:
+                problems.append(f"{bits}: move {move} after the game")
+            continue
+        if move not in bitboard_actions(bits):
+            problems.append(f"{bits}: illegal move {move}")
+            continue
+        child = bitboard_result(bits, move)
+        outcome, _ = search(child, -2, 2, table)
+        if outcome != expected:
+            problems.append(f"{bits}: move {move} gives {outcome}")
+
+    reachable = {position_index(bits) for bits in solutions}
+    for index, entry in enumerate(entries):
+        if index not in reachable and entry != UNREACHABLE:
+            problems.append(f"index {index}: entry for unreachable position")
+    return problems
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if len(sys.argv) > 2 or command not in ("build", "verify"):
+        sys.exit("Usage: python solved.py [build|verify]")
+
+    if command == "build":
+        entries = build()
+        save(entries)
+        positions = sum(entry != UNREACHABLE for entry in entries)
+        print(f"Solved {positions} positions into {TABLE}.")
+        return
+
+    entries = load_table()
+    if entries is None:
+        sys.exit(f"No table at {TABLE}; run python solved.py build.")
+    problems = verify(entries)
+    if entries != build():
+        problems.append("table differs from a fresh build")
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(f"{len(problems)} problems found.")
+    print("Table matches the search on every position.")
+
+
+if __name__ == "__main__":
+    main()
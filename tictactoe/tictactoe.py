@@ -1,14 +1,52 @@
 """
 Tic Tac Toe Player
+
+The public functions take boards as lists of lists. Internally they run
+on bitboards: a pair of 9-bit integers (x, o) marking the cells each
+player holds, where cell (i, j) is bit 3 * i + j.
 """
 
-import math
-from copy import deepcopy
+import os
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Solved-game table written by solved.py, kept next to this file
+TABLE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "tictactoe.solved"
+)
+TABLE_MAGIC = b"TTTSOLVE"
+TABLE_VERSION = 1
+
+# Table entry for a position that cannot arise in play, and the move
+# recorded for a finished game
+UNREACHABLE = 0xFF
+NO_MOVE = 0x0F
+
+# Every cell of a bitboard
+FULL = 0b111_111_111
+
+# Cells of each row, column and diagonal
+WIN_MASKS = (
+    0b000_000_111, 0b000_111_000, 0b111_000_000,
+    0b001_001_001, 0b010_010_010, 0b100_100_100,
+    0b100_010_001, 0b001_010_100,
+)
+
+# Whether a player holding a 9-bit set of cells has three in a row
+WINNING = [
+    any(cells & mask == mask for mask in WIN_MASKS)
+    for cells in range(FULL + 1)
+]
+
+# Base 3 value of a 9-bit set of cells with each held cell's digit set to 1
+TERNARY = [
+    sum(3 ** cell for cell in range(9) if cells >> cell & 1)
+    for cells in range(FULL + 1)
+]
+
 
 def initial_state():
     """
@@ -23,169 +61,395 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    # X always plays first
-    next_player = X
-    if board == initial_state():
-        return next_player
-    
-    number_of_x_moves = 0
-    number_of_o_moves = 0
-
-    # Count how many moves each player has made
-    for row in board:
-        number_of_x_moves += row.count(X)
-        number_of_o_moves += row.count(O)
-    
-    # return player with fewest moves
-    if number_of_x_moves < number_of_o_moves:
-        return next_player
-    elif number_of_x_moves == number_of_o_moves:
-        return next_player
-    else:
-        return O
+    return bitboard_player(to_bitboard(board))
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    actions = set()
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                actions.add((i, j))
-    return actions
+    return {divmod(cell, 3) for cell in bitboard_actions(to_bitboard(board))}
 
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    board_copy = deepcopy(board)
-    if action in actions(board):
-        board_copy[action[0]][action[1]] = player(board)
-        return board_copy
-    raise Exception
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
+        raise ValueError(f"invalid action {action}")
+    return from_bitboard(bitboard_result(to_bitboard(board), 3 * i + j))
 
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    # Check each row
-    for row in board:
-        if len(set(row)) == 1:
-            return row[0]
-    
-    # Check each column
-    for i in range(3):
-        column_set = set()
-        for j in range(3):
-            column_set.add(board[j][i])
-        if len(column_set) == 1:
-            return list(column_set)[0]
-    
-    # Check diagonals
-    diagonal_set = set()
-    for i in range(3):
-        diagonal_set.add(board[i][i])
-    if len(diagonal_set) == 1:
-        return list(diagonal_set)[0]
-    diagonal_set = set()
-    i, j = 0, 2
-    while j >= 0:
-        diagonal_set.add(board[i][j])
-        j -= 1
-        i += 1
-    if len(diagonal_set) == 1:
-        return list(diagonal_set)[0]
+    return bitboard_winner(to_bitboard(board))
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    is_won = winner(board) is not None
-    no_more_actions = len(actions(board)) == 0
-    return is_won or no_more_actions
+    return bitboard_terminal(to_bitboard(board))
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    game_winner = winner(board)
-    if game_winner == X:
+    return bitboard_utility(to_bitboard(board))
+
+
+def minimax(board, table=None, stats=None):
+    """
+    Returns the optimal action for the current player on the board.
+
+    Without a `table`, the move is read from the solved-game table if it
+    has been built. Otherwise positions are searched, looking them up in
+    (and adding them to) the transposition `table`, by default one shared
+    by every call in the process. Counters describing the work done are
+    added to `stats`, a Stats, if one is given.
+    """
+    cell = bitboard_minimax(to_bitboard(board), table, stats)
+    if cell is None:
+        return None
+    return divmod(cell, 3)
+
+
+def to_bitboard(board):
+    """
+    Returns the (x, o) bitboard for a list of lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (3 * i + j)
+            elif cell == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def from_bitboard(bits):
+    """
+    Returns the list of lists board for an (x, o) bitboard.
+    """
+    x, o = bits
+    board = initial_state()
+    for cell in range(9):
+        if x >> cell & 1:
+            board[cell // 3][cell % 3] = X
+        elif o >> cell & 1:
+            board[cell // 3][cell % 3] = O
+    return board
+
+
+def bitboard_player(bits):
+    """
+    Returns player who has the next turn on a bitboard.
+    """
+    # X always plays first, so moves alternate from equal counts
+    x, o = bits
+    return X if x.bit_count() <= o.bit_count() else O
+
+
+def bitboard_actions(bits):
+    """
+    Returns the empty cells of a bitboard, in increasing order.
+    """
+    free = FULL & ~(bits[0] | bits[1])
+    return [cell for cell in range(9) if free >> cell & 1]
+
+
+def bitboard_result(bits, cell):
+    """
+    Returns the bitboard that results from the current player marking
+    `cell`.
+    """
+    x, o = bits
+    move = 1 << cell
+    if not 0 <= cell < 9 or (x | o) & move:
+        raise ValueError(f"invalid action {divmod(cell, 3)}")
+    if bitboard_player(bits) == X:
+        return x | move, o
+    return x, o | move
+
+
+def bitboard_winner(bits):
+    """
+    Returns the winner of the game on a bitboard, if there is one.
+    """
+    x, o = bits
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def bitboard_terminal(bits):
+    """
+    Returns True if the game on a bitboard is over, False otherwise.
+    """
+    x, o = bits
+    return WINNING[x] or WINNING[o] or x | o == FULL
+
+
+def bitboard_utility(bits):
+    """
+    Returns 1 if X has won on a bitboard, -1 if O has won, 0 otherwise.
+    """
+    x, o = bits
+    if WINNING[x]:
         return 1
-    if game_winner == O:
+    if WINNING[o]:
         return -1
-    if not game_winner:
-        return 0
+    return 0
+
 
+def bitboard_minimax(bits, table=None, stats=None):
+    """
+    Returns the optimal cell for the current player on a bitboard, or None
+    if the game is over.
+    """
+    if bitboard_terminal(bits):
+        return None
+    if stats is not None:
+        start = time.perf_counter()
+    if table is None:
+        if solved is not None:
+            entry = solved[position_index(bits)]
+            if entry != UNREACHABLE:
+                if stats is not None:
+                    stats.solved_hits += 1
+                    stats.seconds += time.perf_counter() - start
+                return entry & NO_MOVE
+        table = transpositions
+    _, move = search(bits, -2, 2, table, stats)
+    if stats is not None:
+        stats.seconds += time.perf_counter() - start
+    return move
 
 
-def minimax(board):
+def position_index(bits):
     """
-    Returns the optimal action for the current player on the board.
+    Returns the index of a bitboard in the solved-game table: the board
+    read as a base 3 number, with cell 3 * i + j as digit 3 * i + j and
+    0 for empty, 1 for X and 2 for O.
+    """
+    x, o = bits
+    return TERNARY[x] + 2 * TERNARY[o]
+
+
+def load_table(path=TABLE):
+    """
+    Returns the entries of the solved-game table written by solved.py, one
+    byte per position index holding the best cell in its low 4 bits and
+    the value plus 1 in the next 2, or None if the table is missing or was
+    written by another version.
+    """
+    header = TABLE_MAGIC + bytes([TABLE_VERSION])
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(header)] != header or len(data) != len(header) + 3 ** 9:
+        return None
+    return data[len(header):]
+
+
+# Solved-game table entries, if the table has been built
+solved = load_table()
+
+
+class Stats():
+    """
+    Counters a search adds to when given one as `stats`: positions
+    visited, alpha-beta cutoffs at each ply from the root, positions
+    answered from a transposition table or the solved-game table, the
+    deepest ply reached and the seconds spent.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.cutoffs = {}
+        self.table_hits = 0
+        self.solved_hits = 0
+        self.max_depth = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return (
+            f"Stats(nodes={self.nodes}, cutoffs={self.cutoffs}, "
+            f"table_hits={self.table_hits}, "
+            f"solved_hits={self.solved_hits}, "
+            f"max_depth={self.max_depth}, seconds={self.seconds:.6f})"
+        )
+
+    def cutoff(self, ply):
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+
+    def add(self, other):
+        """
+        Adds the counters of another Stats to these.
+        """
+        self.nodes += other.nodes
+        for ply, count in other.cutoffs.items():
+            self.cutoffs[ply] = self.cutoffs.get(ply, 0) + count
+        self.table_hits += other.table_hits
+        self.solved_hits += other.solved_hits
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.seconds += other.seconds
+
+
+# Bound stored with a transposition table value
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def symmetries():
+    """
+    Returns the 8 rotations and reflections of the board, each as a list
+    mapping every cell to the cell it moves to.
+    """
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (j, 2 - i),
+        lambda i, j: (2 - i, 2 - j),
+        lambda i, j: (2 - j, i),
+        lambda i, j: (i, 2 - j),
+        lambda i, j: (2 - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (2 - j, 2 - i),
+    ]
+    images = []
+    for transform in transforms:
+        image = []
+        for cell in range(9):
+            i, j = transform(*divmod(cell, 3))
+            image.append(3 * i + j)
+        images.append(image)
+    return images
+
+
+SYMMETRIES = symmetries()
+
+# For each symmetry, every 9-bit set of cells mapped to its image
+SYMMETRY_MASKS = [
+    [
+        sum(1 << image[cell] for cell in range(9) if cells >> cell & 1)
+        for cells in range(FULL + 1)
+    ]
+    for image in SYMMETRIES
+]
+
+
+class TranspositionTable():
+    """
+    Search results keyed on a canonical encoding of the bitboard, so a
+    position and its rotations and reflections are searched only once.
     """
-    def mini(board, action=None, best_score=-2, alpha=-2, beta=2):
-        mini_score = 2
-        best_move = action
-
-        # Return if board is in terminal state
-        if terminal(board):
-            return (board, action, utility(board))
-        
-        # Iterate through each valid move
-        valid_moves = actions(board)
-        for move in valid_moves:
-            result_board = result(board, move)
-
-            # If we win with the current move, return it
-            if terminal(result_board) and winner(result_board) == O:
-                return (board, move, -1)
-            
-            # Check the best score that X can get when we play the current move
-            _, _, best_max_score = maxi(result_board, move, best_score, alpha, beta)
-
-            if best_max_score < mini_score:
-                mini_score = best_max_score
-                best_move = move
-            
-            # Alpha-beta pruning
-            if mini_score <= alpha:
-                return(board, move, mini_score)
-            if mini_score < beta:
-                beta = mini_score
-
-        return (board, best_move, mini_score)
-    
-
-    # Inverse of mini above
-    def maxi(board, action=None, best_score=-2, alpha=-2, beta=2):
-        max_score = -2
-        best_move = action
-        if terminal(board):
-            return (board, action, utility(board))
-        valid_moves = actions(board)
-        for move in valid_moves:
-            result_board = result(board, move)
-            if terminal(result_board) and winner(result_board) == X:
-                return (board, move, 1)
-            _, _, best_min_score = mini(result_board, move, best_score, alpha, beta)
-            if best_min_score > max_score:
-                max_score = best_min_score
-                best_move = move
-            if max_score >= beta:
-                return (board, move, max_score)
-            if max_score > alpha:
-                alpha = max_score
-        return (board, best_move, max_score)
-
-    current_player = player(board)
-    if current_player == X:
-        _, best_maxi_action, _ = maxi(board)
-        return best_maxi_action
+
+    def __init__(self):
+        self.entries = {}
+
+    def canonical(self, bits):
+        """
+        Returns the smallest encoding of the bitboard over its symmetries,
+        and the index of the symmetry that produces it.
+        """
+        x, o = bits
+        return min(
+            (masks[x] << 9 | masks[o], symmetry)
+            for symmetry, masks in enumerate(SYMMETRY_MASKS)
+        )
+
+    def lookup(self, bits):
+        """
+        Returns the (value, bound, best cell) stored for the bitboard,
+        with the cell mapped back onto it, or None.
+        """
+        code, symmetry = self.canonical(bits)
+        entry = self.entries.get(code)
+        if entry is None:
+            return None
+        value, bound, move = entry
+        if move is not None:
+            move = SYMMETRIES[symmetry].index(move)
+        return value, bound, move
+
+    def store(self, bits, value, bound, move):
+        code, symmetry = self.canonical(bits)
+        if move is not None:
+            move = SYMMETRIES[symmetry][move]
+        self.entries[code] = (value, bound, move)
+
+
+# Transposition table shared by minimax calls in this process
+transpositions = TranspositionTable()
+
+
+def search(bits, alpha, beta, table, stats=None, ply=0):
+    """
+    Returns the value of a bitboard (1 if X wins with best play, -1 if O
+    wins, 0 for a tie) and a best cell, by alpha-beta search between
+    `alpha` and `beta`. Values outside that window are only bounds.
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.max_depth = max(stats.max_depth, ply)
+    x, o = bits
+    if WINNING[x]:
+        return 1, None
+    if WINNING[o]:
+        return -1, None
+    if x | o == FULL:
+        return 0, None
+
+    entry = table.lookup(bits)
+    preferred = None
+    if entry is not None:
+        value, bound, preferred = entry
+        if (bound == EXACT
+                or (bound == LOWER and value >= beta)
+                or (bound == UPPER and value <= alpha)):
+            if stats is not None:
+                stats.table_hits += 1
+            return value, preferred
+
+    # Try the stored best move first, then the rest in board order
+    moves = bitboard_actions(bits)
+    if preferred in moves:
+        moves.remove(preferred)
+        moves.insert(0, preferred)
+
+    maximizing = x.bit_count() <= o.bit_count()
+    window = (alpha, beta)
+    best_value, best_move = (-2 if maximizing else 2), None
+    for move in moves:
+        if maximizing:
+            child = (x | 1 << move, o)
+        else:
+            child = (x, o | 1 << move)
+        value, _ = search(child, alpha, beta, table, stats, ply + 1)
+        if maximizing and value > best_value:
+            best_value, best_move = value, move
+            alpha = max(alpha, value)
+        elif not maximizing and value < best_value:
+            best_value, best_move = value, move
+            beta = min(beta, value)
+        if alpha >= beta:
+            if stats is not None:
+                stats.cutoff(ply)
+            break
+
+    if best_value <= window[0]:
+        bound = UPPER
+    elif best_value >= window[1]:
+        bound = LOWER
     else:
-        _, best_mini_action, _ = mini(board)
-        return best_mini_action
+        bound = EXACT
+    table.store(bits, best_value, bound, best_move)
+    return best_value, best_move
@@ -0,0 +1,152 @@
+"""
+Headless AI-vs-AI tic-tac-toe matches.
+
+Plays a number of games between two players without opening a window,
+spread over a pool of worker processes, and reports wins, draws and
+losses with move rates and per-move latency percentiles. The players
+swap X and O every game. Available players:
+
+    minimax   the solved 3x3 game (3x3 boards only)
+    search    mnk iterative-deepening alpha-beta within the time budget
+    mcts      Monte Carlo tree search within the time budget
+    random    a random empty cell
+
+Usage: python tournament.py PLAYER PLAYER [--games N] [--board M,N,K]
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mnk
+import tictactoe as ttt
+from mcts import MCTS
+
+
+def minimax_player(game, time_limit, rng):
+    if (game.m, game.n, game.k) != (3, 3, 3):
+        raise ValueError("minimax only plays 3x3 boards with 3 in a row")
+    return ttt.bitboard_minimax
+
+
+def search_player(game, time_limit, rng):
+    return lambda bits: game.best_move(bits, time_limit)
+
+
+def mcts_player(game, time_limit, rng):
+    return MCTS(
+        game, time_limit=time_limit, seed=rng.randrange(2 ** 32)
+    ).best_move
+
+
+def random_player(game, time_limit, rng):
+    return lambda bits: rng.choice(game.actions(bits))
+
+
+# Functions returning a move function for a game, by player name
+PLAYERS = {
+    "minimax": minimax_player,
+    "search": search_player,
+    "mcts": mcts_player,
+    "random": random_player,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play tic-tac-toe AIs against each other headlessly."
+    )
+    parser.add_argument("players", nargs=2, choices=PLAYERS,
+                        metavar="PLAYER",
+                        help="players: " + ", ".join(PLAYERS))
+    parser.add_argument("-g", "--games", type=int, default=100,
+                        help="number of games (default: 100)")
+    parser.add_argument("-b", "--board", default="3,3,3",
+                        help="rows, columns and marks in a row to win "
+                             "(default: 3,3,3)")
+    parser.add_argument("-t", "--time", type=float, default=0.1,
+                        help="seconds per move for search and mcts "
+                             "(default: 0.1)")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=50,
+                        help="seed for the random players (default: 50)")
+    args = parser.parse_args()
+
+    try:
+        m, n, k = (int(value) for value in args.board.split(","))
+        game = mnk.Game(m, n, k)
+        for name in args.players:
+            PLAYERS[name](game, args.time, random.Random())
+    except ValueError as e:
+        parser.error(str(e))
+
+    games = [
+        (game, args.players, number % 2, args.time, args.seed + number)
+        for number in range(args.games)
+    ]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        results = list(pool.map(play, games))
+    seconds = time.perf_counter() - start
+
+    report(args.players, results, seconds)
+
+
+def play(match):
+    """
+    Plays one game and returns its outcome for the first player (1 for a
+    win, 0 for a draw, -1 for a loss) and the seconds each player took per
+    move.
+    """
+    game, names, swapped, time_limit, seed = match
+    rng = random.Random(seed)
+    players = [PLAYERS[name](game, time_limit, rng) for name in names]
+    latencies = ([], [])
+
+    # The first player is X unless swapped
+    bits = game.initial_state()
+    while not game.terminal(bits):
+        turn = (game.player(bits) == ttt.O) != bool(swapped)
+        start = time.perf_counter()
+        cell = players[turn](bits)
+        latencies[turn].append(time.perf_counter() - start)
+        bits = game.result(bits, cell)
+
+    outcome = game.utility(bits)
+    return (-outcome if swapped else outcome), latencies
+
+
+def report(names, results, seconds):
+    outcomes = [outcome for outcome, _ in results]
+    wins, draws = outcomes.count(1), outcomes.count(0)
+    losses = outcomes.count(-1)
+    print(f"{len(results)} games in {seconds:.2f}s: {names[0]} won {wins}, "
+          f"drew {draws}, lost {losses} against {names[1]}.")
+
+    for turn, name in enumerate(names):
+        samples = sorted(
+            sample for _, latencies in results for sample in latencies[turn]
+        )
+        if not samples:
+            continue
+        rate = len(samples) / sum(samples) if sum(samples) else float("inf")
+        print(f"{name} (player {turn + 1}): {len(samples)} moves, "
+              f"{rate:.1f} moves/s, latency ms "
+              f"p50 {percentile(samples, 50) * 1000:.2f}, "
+              f"p90 {percentile(samples, 90) * 1000:.2f}, "
+              f"p99 {percentile(samples, 99) * 1000:.2f}, "
+              f"max {samples[-1] * 1000:.2f}")
+
+
+def percentile(ordered, percent):
+    """
+    Returns the nearest-rank percentile of a sorted list of samples.
+    """
+    rank = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[rank]
+
+
+if __name__ == "__main__":
+    main()